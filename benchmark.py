@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the translator - no API key or network access needed
+"""
+
+import argparse
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+import google.generativeai as genai
+from pptx import Presentation
+from pptx.util import Inches
+
+import translator
+from translator import GeminiTranslator, PPTXProcessor, TranslationCache, TranslationMemory, PROMPT_VERSION, context_hash, open_jsonl
+
+
+def stub_generate_content(self, *args, **kwargs):
+    """Stand-in for the network call so only client-side overhead is measured."""
+    return None
+
+
+async def bench_call_overhead(calls: int):
+    """Per-call overhead of a Gemini request: new client + to_thread vs cached client + dedicated pool."""
+
+    print(f"⏱️  Per-call overhead ({calls} calls, network stubbed out)")
+    print("=" * 50)
+
+    genai.GenerativeModel.generate_content = stub_generate_content
+    prompt = "Translate: Hello"
+
+    # Before: a new GenerativeModel per call, dispatched with asyncio.to_thread
+    start = time.perf_counter()
+    for _ in range(calls):
+        model = genai.GenerativeModel("gemini-2.5-flash")
+        await asyncio.wait_for(asyncio.to_thread(model.generate_content, prompt), timeout=30)
+    before = (time.perf_counter() - start) / calls
+
+    # After: cached client and dedicated executor (limits raised so they never throttle)
+    gemini = GeminiTranslator("dummy_key", requests_per_minute=1e9, tokens_per_minute=1e12)
+    start = time.perf_counter()
+    for _ in range(calls):
+        await gemini._generate(prompt)
+    after = (time.perf_counter() - start) / calls
+    gemini.close()
+
+    print(f"Before: {before * 1e6:8.1f} µs/call")
+    print(f"After:  {after * 1e6:8.1f} µs/call ({before / after:.1f}x)")
+
+
+def synthetic_translations(entries: int, seed: int = 0):
+    """Deterministic mix of English-like and Chinese slide text drawn from a Zipf-like vocabulary."""
+    rng = random.Random(seed)
+    syllables = ['an', 'ing', 'er', 'tion', 're', 'con', 'de', 'ment', 'pro', 'al', 'ly', 'st', 'com', 'ex', 'ate', 'ive']
+    latin = [''.join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(3000)]
+    hanzi = [chr(rng.randint(0x4E00, 0x4FFF)) for _ in range(800)]
+    cjk = [''.join(rng.choices(hanzi, k=rng.randint(1, 3))) for _ in range(3000)]
+    weights = [1 / rank for rank in range(1, 3001)]
+    for i in range(entries):
+        length = rng.randint(3, 40)
+        if i % 2:
+            text = ''.join(rng.choices(cjk, weights, k=length)) + '。'
+        else:
+            text = ' '.join(rng.choices(latin, weights, k=length)).capitalize() + '.'
+        yield hashlib.md5(str(i).encode()).hexdigest(), 'zh-CN' if i % 2 else 'en', text
+
+
+def bench_cache_storage(entries: int):
+    """Size and load time of the legacy JSON cache vs the SQLite cache, plain and compressed."""
+
+    print(f"💾 Cache storage ({entries} entries)")
+    print("=" * 50)
+    directory = tempfile.mkdtemp()
+    rows = list(synthetic_translations(entries))
+    lookups = random.Random(1).sample(rows, min(1000, len(rows)))
+
+    # Before: one JSON file parsed in full at startup
+    json_path = os.path.join(directory, 'cache.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({source_hash: text for source_hash, _, text in rows}, f, ensure_ascii=False, indent=2)
+    start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        json.load(f)
+    json_load = time.perf_counter() - start
+    print(f"{'JSON (indent=2)':<22} {os.path.getsize(json_path) / 1024 / 1024:8.2f} MB   load: {json_load * 1000:8.1f} ms")
+
+    def sqlite_variant(name: str, compress: bool, dictionary: bool):
+        path = os.path.join(directory, f'{name}.sqlite3')
+        cache = TranslationCache(path, compress=compress)
+        now = time.time()
+        cache.import_entries({
+            'source_hash': source_hash, 'target_language': language, 'model': 'gemini-2.5-flash',
+            'prompt_version': PROMPT_VERSION, 'context_hash': context_hash(''), 'translation': text,
+            'created_at': now, 'last_used_at': now, 'hits': 0
+        } for source_hash, language, text in rows)
+        if dictionary:
+            cache.train_dictionary()
+        cache.vacuum()
+        cache.close()
+
+        # Startup cost is opening the database; entries are then read on demand
+        start = time.perf_counter()
+        cache = TranslationCache(path, memory_limit=0)
+        for source_hash, language, _ in lookups:
+            cache._lookup((source_hash, language, 'gemini-2.5-flash', PROMPT_VERSION, context_hash('')))
+        lookup_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in cache.entries():
+            pass
+        scan_time = time.perf_counter() - start
+        cache.close()
+        print(f"{name:<22} {os.path.getsize(path) / 1024 / 1024:8.2f} MB   open + {len(lookups)} lookups: "
+              f"{lookup_time * 1000:6.1f} ms   full scan: {scan_time * 1000:8.1f} ms")
+        return path
+
+    sqlite_variant('SQLite', compress=False, dictionary=False)
+    sqlite_variant('SQLite + zlib', compress=True, dictionary=False)
+    path = sqlite_variant('SQLite + zlib + dict', compress=True, dictionary=True)
+
+    # Export files are streamed, so memory stays flat however large the cache is
+    cache = TranslationCache(path)
+    for extension in ('jsonl', 'jsonl.gz', 'jsonl.xz'):
+        export_path = os.path.join(directory, f'export.{extension}')
+        start = time.perf_counter()
+        with open_jsonl(export_path, 'w') as f:
+            for entry in cache.entries():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        elapsed = time.perf_counter() - start
+        print(f"{'Export .' + extension:<22} {os.path.getsize(export_path) / 1024 / 1024:8.2f} MB   write: {elapsed * 1000:8.1f} ms")
+    cache.close()
+
+
+def templated_slide_texts(count: int, vocabulary: int = 5000, seed: int = 0):
+    """Slide text from a handful of templates, the worst case for trigram LSH buckets."""
+    rng = random.Random(seed)
+    templates = [
+        "Q{q} revenue for the {a} region grew by {n}% compared to last year",
+        "Click here to learn more about {a} {b} and {c} solutions",
+        "Key takeaway: the {a} team delivered {n} projects on time in {b}",
+        "Agenda item {n}: review of the {a} {b} roadmap and next steps",
+        "Customer satisfaction with {a} support reached {n} points in Q{q}",
+    ]
+    words = [f"term{i}" for i in range(vocabulary)]
+    for _ in range(count):
+        yield rng.choice(templates).format(q=rng.randint(1, 4), n=rng.randint(1, 999),
+                                           a=rng.choice(words), b=rng.choice(words), c=rng.choice(words))
+
+
+def bench_translation_memory(entries: int, lookups: int = 1000):
+    """Fuzzy lookup latency and recall of the translation memory on templated slide text."""
+
+    print(f"🔎 Translation memory ({entries} entries, {lookups} lookups)")
+    print("=" * 50)
+    cache = TranslationCache(os.path.join(tempfile.mkdtemp(), 'memory.sqlite3'))
+    memory = TranslationMemory(cache, flush_every=10000)
+    texts = list(dict.fromkeys(templated_slide_texts(entries)))
+    start = time.perf_counter()
+    for text in texts:
+        memory.add(text, 'fr', text.upper())
+    memory.flush()
+    print(f"Build:                {time.perf_counter() - start:8.1f} s")
+
+    # Unseen texts: mostly misses or references from the same template
+    queries = list(templated_slide_texts(lookups, seed=1))
+    start = time.perf_counter()
+    found = sum(memory.lookup(text, 'fr') is not None for text in queries)
+    elapsed = time.perf_counter() - start
+    print(f"New texts:            {elapsed / lookups * 1000:8.3f} ms/lookup ({found} with a match)")
+
+    # Near duplicates of stored texts: one word changed
+    originals = random.Random(2).sample(texts, min(lookups, len(texts)))
+    queries = [text.replace(" the ", " our ", 1) if " the " in text else text + "!" for text in originals]
+    start = time.perf_counter()
+    matches = [memory.lookup(text, 'fr') for text in queries]
+    elapsed = time.perf_counter() - start
+    # A match counts if it is at least as similar as the original (other texts may differ by one word too)
+    recall = sum(match is not None and match[0] >= difflib.SequenceMatcher(None, original, text, autojunk=False).ratio()
+                 for match, original, text in zip(matches, originals, queries))
+    print(f"Near duplicates:      {elapsed / len(queries) * 1000:8.3f} ms/lookup (recall {recall}/{len(queries)})")
+    cache.close()
+
+
+def build_deck(path: str, slides: int, rows: int = 12, cols: int = 6):
+    """Synthetic deck of slides with a title, a bulleted text box and a dense table each."""
+    presentation = Presentation()
+    for n in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {n} title"
+        text_frame = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(2)).text_frame
+        text_frame.text = f"Key point {n}"
+        for bullet in range(5):
+            text_frame.add_paragraph().text = f"Supporting detail {bullet} for point {n}"
+        table = slide.shapes.add_table(rows, cols, Inches(0.5), Inches(3.5), Inches(9), Inches(3)).table
+        for row in range(rows):
+            for col in range(cols):
+                table.cell(row, col).text = f"R{row}C{col} {n}"
+    presentation.save(path)
+
+
+def bench_extraction(slides: int):
+    """Text extraction through the python-pptx object model vs direct slide XML parsing."""
+
+    print(f"📄 Text extraction ({slides} slides with a 12x6 table each)")
+    print("=" * 50)
+    path = os.path.join(tempfile.mkdtemp(), 'deck.pptx')
+    build_deck(path, slides)
+    processor = PPTXProcessor(translator=None)
+
+    # Before: load the presentation and walk shapes, paragraphs and cells as python-pptx objects
+    start = time.perf_counter()
+    before_elements = processor.extract_all_text(Presentation(path))
+    before = time.perf_counter() - start
+
+    # After: parse the slide parts straight from the package
+    start = time.perf_counter()
+    after_elements = processor.extract_all_text_xml(path)
+    after = time.perf_counter() - start
+
+    def comparable(element):
+        return {key: value for key, value in element.items() if key not in ('shape', 'table', 'paragraph', 'cell', 'locator')}
+    same = [comparable(element) for element in before_elements] == [comparable(element) for element in after_elements]
+
+    print(f"python-pptx: {before * 1000:8.1f} ms ({len(before_elements)} elements)")
+    print(f"Slide XML:   {after * 1000:8.1f} ms ({len(after_elements)} elements, {before / after:.1f}x, identical: {same})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translator micro-benchmarks")
+    parser.add_argument('--calls', type=int, default=2000, help='Number of calls per measurement')
+    parser.add_argument('--cache-entries', type=int, default=100000, help='Number of entries in the cache storage benchmark')
+    parser.add_argument('--memory-entries', type=int, default=100000, help='Number of texts in the translation memory benchmark')
+    parser.add_argument('--slides', type=int, default=500, help='Number of slides in the extraction benchmark')
+    args = parser.parse_args()
+
+    translator.logger.setLevel("ERROR")
+    asyncio.run(bench_call_overhead(args.calls))
+    print()
+    bench_cache_storage(args.cache_entries)
+    print()
+    bench_translation_memory(args.memory_entries)
+    print()
+    bench_extraction(args.slides)
+
+
+if __name__ == "__main__":
+    main()
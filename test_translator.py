@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the translation cache and request pipeline.
+
+The Gemini API is replaced by a fake ``generate_content``, so no API key or
+network is needed. Run with ``python -m pytest -q test_translator.py``.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+
+import pytest
+
+import translator
+from translator import GeminiTranslator
+
+
+class FakeResponse:
+    """Minimal stand-in for a Gemini response."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeGemini:
+    """Translates by prefixing "FR " and records every prompt it receives."""
+
+    def __init__(self):
+        self.prompts = []
+        self.error = None  # Raised by every call when set
+        self.drop = ()  # Source fragments that are never translated
+
+    def generate_content(self, prompt: str, *args, **kwargs):
+        self.prompts.append(prompt)
+        if self.error is not None:
+            raise self.error
+        match = re.search(r'Segments: (\[.*\])', prompt, re.DOTALL)
+        if match:
+            return FakeResponse(json.dumps({
+                item['id']: f"FR {item['text']}"
+                for item in json.loads(match.group(1)) if not any(drop in item['text'] for drop in self.drop)
+            }, ensure_ascii=False))
+        text = re.search(r'Text to translate: "(.*)"', prompt, re.DOTALL).group(1)
+        if any(drop in text for drop in self.drop):
+            raise translator.TranslationError("Empty response from Gemini API")
+        return FakeResponse(f"FR {text}")
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(translator.genai.GenerativeModel, 'generate_content',
+                        lambda model, prompt, *args, **kwargs: fake.generate_content(prompt, *args, **kwargs))
+    monkeypatch.setattr(translator, 'retry_delay', lambda attempt, error=None: 0.0)
+    return fake
+
+
+def make_translator(tmp_path, **options) -> GeminiTranslator:
+    options = {'requests_per_minute': 1e9, 'tokens_per_minute': 1e12, **options}
+    return GeminiTranslator("test-key", cache_path=str(tmp_path / 'cache.sqlite3'), **options)
+
+
+def test_partly_failed_paragraph_is_not_cached(gemini, tmp_path):
+    """A split paragraph with a piece that fell back to English must be translated again next run."""
+    paragraph = " ".join(f"Sentence {i} describes the 3.5 release, e.g. its cache." for i in range(12))
+    options = {'batch_size': 10, 'max_input_tokens': 260, 'max_output_tokens': 120}
+
+    gemini.drop = ("Sentence 5 ",)
+    first = make_translator(tmp_path, **options)
+    pieces = first.get_packer().split(paragraph)
+    assert len(pieces) > 2
+    expected = first.get_packer().join([f"FR {piece}" for piece, _ in pieces], [separator for _, separator in pieces])
+    result = asyncio.run(first.translate_batch([paragraph], "fr", show_progress=False))[0]
+    first.close()
+    assert result != expected and "FR Sentence 0 " in result
+    assert first.untranslated_count == 1
+
+    gemini.drop = ()
+    gemini.prompts.clear()
+    second = make_translator(tmp_path, **options)
+    result = asyncio.run(second.translate_batch([paragraph], "fr", show_progress=False))[0]
+    second.close()
+    assert gemini.prompts, "the partly untranslated paragraph was served from the cache"
+    assert result == expected
+    # Pieces translated in the first run are reused; only the failed one is sent again
+    assert all("Sentence 0 " not in prompt for prompt in gemini.prompts)
+
+
+def test_invalid_api_key_fails_every_text_at_once(gemini, tmp_path):
+    """An invalid key must not feed the pause-and-probe loop of the circuit breaker."""
+    gemini.error = Exception("403 API key not valid. Please pass a valid API key.")
+    texts = [f"text {i}" for i in range(30)]
+    gemini_translator = make_translator(tmp_path, concurrency=4, breaker_reset=30)
+
+    started = time.monotonic()
+    results = asyncio.run(gemini_translator.translate_batch(texts, "fr", show_progress=False))
+    gemini_translator.close()
+
+    assert results == texts
+    assert gemini_translator.untranslated_count == len(texts)
+    assert time.monotonic() - started < 5
+    assert len(gemini.prompts) <= 4
+
+
+def test_transient_outage_pauses_instead_of_dropping(gemini, tmp_path):
+    """Texts queued behind an open circuit are translated once a probe succeeds."""
+    failures = iter(range(6))
+
+    def flaky(prompt, *args, **kwargs):
+        if next(failures, None) is not None:
+            raise Exception("503 Service Unavailable")
+        return FakeResponse("ok")
+
+    gemini.generate_content = flaky
+    gemini_translator = make_translator(tmp_path, concurrency=4, breaker_reset=0.2, fuzzy_threshold=0)
+    results = asyncio.run(gemini_translator.translate_batch([f"text {i}" for i in range(30)], "fr", show_progress=False))
+    gemini_translator.close()
+    assert results == ["ok"] * 30
+
+
+def test_live_journal_is_left_alone_and_abandoned_one_recovered(tmp_path):
+    """A journal is only replayed once no process holds its lock."""
+    path = str(tmp_path / 'cache.sqlite3')
+    key = (translator.source_hash("Hello", "fr"), "fr", "gemini-2.5-flash", translator.PROMPT_VERSION,
+           translator.context_hash(""))
+    running = translator.TranslationCache(path)
+    running[key] = "Bonjour"
+
+    # Another process (here: another cache) opening the database must not take the live journal
+    other = translator.TranslationCache(path)
+    assert other.get(key) is None
+    assert os.path.exists(running.journal_path)
+
+    # A run killed before compacting leaves an unlocked journal behind
+    with open(str(tmp_path / 'cache.sqlite3.4242-dead.journal'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps([*key[:2], "other-model", *key[3:], "Salut"]) + "\n")
+    recovering = translator.TranslationCache(path)
+    assert recovering.get((key[0], key[1], "other-model", *key[3:])) == "Salut"
+    assert not os.path.exists(str(tmp_path / 'cache.sqlite3.4242-dead.journal'))
+    assert os.path.exists(running.journal_path)
+
+    for cache in (running, other, recovering):
+        cache.close()
+    assert translator.TranslationCache(path).get(key) == "Bonjour"
@@ -9,17 +9,42 @@ import json
 import hashlib
 import argparse
 import asyncio
+import difflib
+import gzip
 import logging
+import lzma
+import posixpath
+import random
+import re
+import sqlite3
+import struct
 import sys
+import zipfile
+import zlib
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator, Set, Container
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
 
 import google.generativeai as genai
+from lxml import etree
 from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.table import Table
+from pptx.opc.package import XmlPart
+from pptx.oxml import parse_xml
+from pptx.table import Table, _Cell
 from pptx.slide import Slide
+from pptx.text.text import _Paragraph
 
 # Configure logging
 logging.basicConfig(
@@ -74,148 +99,2233 @@ class ProgressTracker:
         bar = '█' * filled_length + '░' * (bar_length - filled_length)
         return bar
 
+# CJK/kana/hangul characters are roughly one token each; other scripts average ~4 characters per token
+_WIDE_CHAR_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+# A sentence runs up to (and including) its terminal punctuation and any whitespace after it.
+# Latin "." "!" "?" only end one before whitespace and a capital, CJK character or opening quote
+# (or at the end), so abbreviations like "e.g." and numbers like "3.5" are never cut.
+_SENTENCE_START = r'[A-ZÀ-ÖØ-ÞΑ-ΩА-Я"“‘\'(\[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]'
+_SENTENCE_RE = re.compile(
+    r'.*?(?:[.!?]+["\'”’)\]]*(?=\s+' + _SENTENCE_START + r'|\s*$)|;(?=\s)|[。！？；]+["\'”’)\]]*|\n|$)\s*',
+    re.DOTALL
+)
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text without calling the API."""
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+class SegmentPacker:
+    """Pack translation segments into requests that fit an input and an expected output token budget."""
+    
+    def __init__(self, max_input_tokens: int = 2000, max_output_tokens: int = 4000, max_segments: Optional[int] = None,
+                 output_ratio: float = 1.5, prompt_tokens: int = 200, segment_overhead: int = 10):
+        """
+        Initialize the packer.
+        
+        Args:
+            max_input_tokens: Estimated input tokens allowed per request (prompt included)
+            max_output_tokens: Estimated output tokens allowed per request
+            max_segments: Maximum number of segments per request (None for no limit)
+            output_ratio: Expected output/input token ratio of a translation
+            prompt_tokens: Estimated tokens of the fixed prompt text
+            segment_overhead: Estimated tokens of JSON wrapping per segment
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_segments = max_segments
+        self.output_ratio = output_ratio
+        self.prompt_tokens = prompt_tokens
+        self.segment_overhead = segment_overhead
+    
+    @property
+    def max_segment_tokens(self) -> int:
+        """Largest segment (in estimated tokens) that fits in a request on its own."""
+        input_room = self.max_input_tokens - self.prompt_tokens - self.segment_overhead
+        output_room = (self.max_output_tokens - self.segment_overhead) / self.output_ratio
+        return max(1, int(min(input_room, output_room)))
+    
+    def split(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Split a text that is too long for one request at sentence boundaries.
+        
+        Returns:
+            List of (chunk, separator) pairs; joining chunk + separator restores the text
+        """
+        limit = self.max_segment_tokens
+        if estimate_tokens(text) <= limit:
+            return [(text, "")]
+        
+        chunks = []
+        current = ""
+        for sentence in _SENTENCE_RE.findall(text):
+            if not sentence:
+                continue
+            if current and estimate_tokens(current + sentence) > limit:
+                chunks.append(current)
+                current = ""
+            # A single sentence over the limit is cut at whitespace (or hard-cut for unspaced scripts)
+            while estimate_tokens(sentence) > limit:
+                cut = self._find_cut(sentence, limit)
+                chunks.append(sentence[:cut])
+                sentence = sentence[cut:]
+            current += sentence
+        if current:
+            chunks.append(current)
+        
+        pairs = []
+        for chunk in chunks:
+            stripped = chunk.rstrip()
+            pairs.append((stripped, chunk[len(stripped):]))
+        return [(chunk, separator) for chunk, separator in pairs if chunk] or [(text, "")]
+    
+    def _find_cut(self, sentence: str, limit: int) -> int:
+        """Find the longest prefix of a sentence that fits the token limit, preferring whitespace."""
+        low, high = 1, len(sentence)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(sentence[:middle]) <= limit:
+                low = middle
+            else:
+                high = middle - 1
+        space = sentence.rfind(" ", 0, low)
+        return space + 1 if space > 0 else low
+    
+    def join(self, translations: List[str], separators: List[str]) -> str:
+        """Re-join translated chunks produced by split()."""
+        parts = []
+        for k, translation in enumerate(translations):
+            parts.append(translation)
+            if k < len(translations) - 1:
+                separator = separators[k]
+                if not separator and translation and not _WIDE_CHAR_RE.match(translation[-1]):
+                    # Unspaced source (e.g. Chinese) translated into a spaced language
+                    separator = " "
+                parts.append(separator)
+        return "".join(parts)
+    
+    def pack(self, segments: List[Any], text_of: Callable[[Any], str] = str) -> List[List[Any]]:
+        """
+        Group segments, in order, into requests that stay within the token budgets.
+        
+        Args:
+            segments: Segments to pack
+            text_of: Function returning the text of a segment
+            
+        Returns:
+            List of packs (lists of segments)
+        """
+        packs = []
+        current = []
+        input_tokens = self.prompt_tokens
+        output_tokens = 0
+        
+        for segment in segments:
+            tokens = estimate_tokens(text_of(segment))
+            segment_input = tokens + self.segment_overhead
+            segment_output = int(tokens * self.output_ratio) + self.segment_overhead
+            
+            if current and (
+                input_tokens + segment_input > self.max_input_tokens
+                or output_tokens + segment_output > self.max_output_tokens
+                or (self.max_segments and len(current) >= self.max_segments)
+            ):
+                packs.append(current)
+                current = []
+                input_tokens = self.prompt_tokens
+                output_tokens = 0
+            
+            current.append(segment)
+            input_tokens += segment_input
+            output_tokens += segment_output
+        
+        if current:
+            packs.append(current)
+        return packs
+
+# Default (requests per minute, input tokens per minute) quotas per model, matching the paid tier 1 limits
+MODEL_RATE_LIMITS = {
+    "gemini-2.5-flash": (1000, 1_000_000),
+    "gemini-2.5-pro": (150, 2_000_000),
+    "gemini-2.0-flash-exp": (10, 250_000),
+    "gemini-2.0-flash": (2000, 4_000_000),
+    "gemini-2.0-pro": (150, 2_000_000),
+    "gemini-1.5-flash": (2000, 4_000_000),
+    "gemini-1.5-pro": (1000, 4_000_000),
+    "gemini-1.5-flash-exp": (10, 250_000),
+    "gemini-1.5-pro-exp": (10, 250_000)
+}
+DEFAULT_RATE_LIMITS = (60, 250_000)
+
+# Requests take a few seconds, so a quota of N requests per minute keeps about N / 60 * 4 in flight;
+# the adaptive controller grows up to that by default (capped so a large quota does not open hundreds)
+TYPICAL_REQUEST_SECONDS = 4
+MAX_DEFAULT_CONCURRENCY = 32
+
+def default_max_concurrency(requests_per_minute: float) -> int:
+    """Concurrency ceiling that a request quota can keep busy (see TYPICAL_REQUEST_SECONDS)."""
+    return max(1, min(MAX_DEFAULT_CONCURRENCY, int(requests_per_minute / 60 * TYPICAL_REQUEST_SECONDS)))
+
+class TokenBucket:
+    """Token bucket that refills continuously at a per-minute rate."""
+    
+    def __init__(self, per_minute: float, burst_seconds: float = 10):
+        """
+        Initialize the bucket.
+        
+        Args:
+            per_minute: Refill rate (units per minute)
+            burst_seconds: Capacity of the bucket, expressed in seconds of refill
+        """
+        self.set_rate(per_minute, burst_seconds)
+        self.available = self.capacity
+        self.updated = time.monotonic()
+    
+    def set_rate(self, per_minute: float, burst_seconds: float = 10):
+        """Change the refill rate (and capacity) of the bucket."""
+        self.rate = max(per_minute, 1) / 60
+        self.capacity = max(self.rate * burst_seconds, 1)
+    
+    def reserve(self, amount: float) -> float:
+        """
+        Take units from the bucket, going into debt if needed.
+        
+        Reservations are served in call order, so waiters never starve each other.
+        
+        Returns:
+            Seconds to wait before the reserved units are actually available
+        """
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request larger than the bucket would otherwise never fit
+        self.available -= min(amount, self.capacity)
+        return max(0.0, -self.available / self.rate)
+    
+    def refund(self, amount: float):
+        """Give back units that were reserved but not used (negative amounts take more)."""
+        self.available = min(self.capacity, self.available + amount)
+
+class RateLimiter:
+    """Shared requests-per-minute and tokens-per-minute limiter for one model."""
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+    
+    def set_limits(self, requests_per_minute: float, tokens_per_minute: float):
+        """Update both quotas in place."""
+        self.requests.set_rate(requests_per_minute)
+        self.tokens.set_rate(tokens_per_minute)
+    
+    async def acquire(self, tokens: int):
+        """Wait until one request of the given estimated token size may be sent."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            logger.debug(f"Rate limiter delaying request by {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+# One limiter per model for the whole process, shared by every translator, batch and file
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+def get_rate_limiter(model: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> RateLimiter:
+    """
+    Get the process-wide rate limiter for a model.
+    
+    Args:
+        model: Gemini model name
+        requests_per_minute: Override for the model's default request quota
+        tokens_per_minute: Override for the model's default token quota
+        
+    Returns:
+        Shared RateLimiter instance
+    """
+    default_rpm, default_tpm = MODEL_RATE_LIMITS.get(model, DEFAULT_RATE_LIMITS)
+    rpm = requests_per_minute or default_rpm
+    tpm = tokens_per_minute or default_tpm
+    
+    limiter = _rate_limiters.get(model)
+    if limiter is None:
+        limiter = _rate_limiters[model] = RateLimiter(rpm, tpm)
+    elif requests_per_minute or tokens_per_minute:
+        limiter.set_limits(rpm, tpm)
+    return limiter
+
+class TranslationError(Exception):
+    """Raised when the Gemini API does not return a usable translation."""
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the Gemini API while the circuit breaker is open."""
+
+# Error kinds that mean the backend is saturated and the request should be re-queued
+OVERLOAD_ERRORS = ('quota', 'timeout')
+# Error kinds worth retrying; 'auth', 'invalid_model', 'circuit_open' and unknown errors fail immediately
+RETRYABLE_ERRORS = ('quota', 'timeout', 'transient')
+# Error kinds no wait can fix (bad API key or model name); they fail every later request at once
+FATAL_ERRORS = ('auth', 'invalid_model')
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify an error raised by a Gemini call.
+    
+    Returns:
+        'quota', 'timeout', 'transient', 'auth', 'invalid_model', 'circuit_open' or 'error'
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, TranslationError):
+        # Empty or blocked responses are usually not repeated on a second attempt
+        return 'transient'
+    
+    name = type(error).__name__
+    message = str(error).lower()
+    if name in ('ResourceExhausted', 'TooManyRequests') or "quota" in message or "429" in message or "rate limit" in message:
+        return 'quota'
+    if name in ('DeadlineExceeded', 'ServiceUnavailable') or "deadline" in message or "timed out" in message or "503" in message:
+        return 'timeout'
+    if name in ('Unauthenticated', 'PermissionDenied') or "api key" in message or "api_key" in message or "permission" in message:
+        return 'auth'
+    if name == 'NotFound' or "404" in message or "not found" in message or "is not supported" in message:
+        return 'invalid_model'
+    if name in ('InternalServerError', 'BadGateway', 'ServerError', 'ConnectionError', 'RemoteDisconnected') \
+            or "500" in message or "502" in message or "internal" in message or "connection" in message:
+        return 'transient'
+    if "key" in message:
+        return 'auth'
+    return 'error'
+
+def retry_delay(attempt: int, error: Optional[BaseException] = None, base: float = 1.0, maximum: float = 60.0) -> float:
+    """
+    Backoff before retry number ``attempt``: exponential with full jitter.
+    
+    A retry delay suggested by the server (e.g. in a 429 response) is honoured as a lower bound.
+    """
+    delay = random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+    match = re.search(r'retry[_ ]?(?:delay|in)\D{0,20}?(\d+(?:\.\d+)?)\s*s', str(error or ""), re.IGNORECASE)
+    if match:
+        delay = max(delay, min(maximum, float(match.group(1))))
+    return delay
+
+class RetryBudget:
+    """Cap the number of retries at a fraction of the requests sent, so an outage cannot multiply load."""
+    
+    def __init__(self, ratio: float = 0.2, minimum: int = 10):
+        """
+        Initialize the budget.
+        
+        Args:
+            ratio: Retries allowed per request sent
+            minimum: Retries always allowed, even before any request succeeded
+        """
+        self.ratio = ratio
+        self.minimum = minimum
+        self.requests = 0
+        self.retries = 0
+        self.exhausted_logged = False
+    
+    def record_request(self):
+        """Count one request sent to the API (retries included)."""
+        self.requests += 1
+    
+    def withdraw(self) -> bool:
+        """Take one retry from the budget; returns False when the budget is spent."""
+        if self.retries >= self.minimum + self.ratio * self.requests:
+            if not self.exhausted_logged:
+                logger.error(f"Retry budget exhausted after {self.retries} retries; failing remaining errors immediately")
+                self.exhausted_logged = True
+            return False
+        self.retries += 1
+        return True
+
+class AdaptiveConcurrency:
+    """AIMD controller for the number of requests in flight."""
+    
+    def __init__(self, initial: int = 1, maximum: Optional[int] = None, minimum: int = 1,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 2.0):
+        """
+        Initialize the controller.
+        
+        Args:
+            initial: Starting concurrency limit
+            maximum: Highest limit the controller may grow to (default: initial)
+            minimum: Lowest limit the controller may shrink to
+            increase: Limit added per window of healthy requests (additive increase)
+            decrease: Factor applied to the limit on quota/timeout errors (multiplicative decrease)
+            latency_tolerance: Requests slower than this multiple of the best latency stop the growth
+        """
+        self.minimum = max(1, minimum)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.reset(initial, maximum)
+        self.in_flight = 0
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self._condition = None
+    
+    def reset(self, initial: int, maximum: Optional[int] = None):
+        """Set the starting and maximum limits."""
+        self.maximum = max(self.minimum, maximum or initial, initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+    
+    @property
+    def current_limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(self.minimum, int(self.limit))
+    
+    async def acquire(self):
+        """Wait for a free slot. Waiters are served in arrival order."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+    
+    async def release(self):
+        """Free a slot and wake as many waiters as the limit allows."""
+        async with self._condition:
+            self.in_flight -= 1
+            free = self.current_limit - self.in_flight
+            if free > 0:
+                self._condition.notify(free)
+    
+    def on_success(self, latency: float):
+        """Grow the limit by ``increase`` per window of healthy requests."""
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        if latency <= self.best_latency * self.latency_tolerance and self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+    
+    def on_overload(self):
+        """Cut the limit after a quota or timeout error (at most once per latency window)."""
+        now = time.monotonic()
+        if now - self.last_decrease < (self.best_latency or 1.0):
+            return
+        self.last_decrease = now
+        previous = self.current_limit
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        if self.current_limit < previous:
+            logger.warning(f"Backing off: concurrency {previous} -> {self.current_limit}")
+
+class CircuitBreaker:
+    """Stop calling a failing backend, then probe it with a single request before resuming."""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, pause: bool = True):
+        """
+        Initialize the breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit (0 disables the breaker)
+            reset_timeout: Seconds the circuit stays open before a half-open probe
+            pause: Make callers wait for the half-open probe while the circuit is open; if False,
+                they fail fast and their texts keep the original wording
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.pause = pause
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.fatal_error: Optional[BaseException] = None
+        self._changed = None
+    
+    def _set_state(self, state: str):
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        self._notify()
+    
+    def _notify(self):
+        """Wake every caller waiting for the circuit to change."""
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+    
+    async def _wait(self, timeout: Optional[float] = None):
+        """Wait until the circuit changes, or at most ``timeout`` seconds."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def before_call(self):
+        """
+        Wait for (or refuse) permission to call the backend.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open and the breaker does not pause,
+                or the backend rejected a request in a way no wait can fix
+        """
+        while True:
+            if self.fatal_error is not None:
+                raise CircuitOpenError(f"Gemini API calls stopped: {self.fatal_error}")
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining <= 0:
+                    # This caller becomes the single half-open probe
+                    logger.info("Circuit half-open: probing the Gemini API with one request")
+                    self._set_state(self.HALF_OPEN)
+                    return
+                if not self.pause:
+                    raise CircuitOpenError(f"Circuit open, Gemini API calls suspended for {remaining:.0f}s")
+                await self._wait(remaining)
+            else:
+                if not self.pause:
+                    raise CircuitOpenError("Circuit half-open, waiting for the probe request")
+                await self._wait()
+    
+    def record_success(self):
+        """Record a call that reached a healthy backend."""
+        self.failures = 0
+        if self.state != self.CLOSED:
+            logger.info("Circuit closed: Gemini API is responding again")
+            self._set_state(self.CLOSED)
+    
+    def record_failure(self):
+        """Record a failed call; opens the circuit after too many in a row."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            logger.error(f"Circuit probe failed, suspending Gemini API calls for {self.reset_timeout:.0f}s")
+            self._set_state(self.OPEN)
+        elif self.state == self.CLOSED and self.failure_threshold and self.failures >= self.failure_threshold:
+            action = "pausing" if self.pause else "failing fast"
+            logger.error(f"Circuit opened after {self.failures} consecutive failures, {action} for {self.reset_timeout:.0f}s")
+            self._set_state(self.OPEN)
+    
+    def record_fatal(self, error: BaseException):
+        """
+        Record an error that no wait or probe can fix (see FATAL_ERRORS).
+        
+        Every later and waiting caller fails at once instead of pausing, whatever the
+        failure threshold; the original texts are kept.
+        """
+        if self.fatal_error is None:
+            logger.error(f"Gemini API rejected the request ({classify_error(error)}: {error}), failing every remaining request")
+            self.fatal_error = error
+        self._notify()
+
+TRANSLATION_PROMPT = """
+            You are a professional translator. Translate the following text to {target_language}.
+            
+            Context: {context}
+            
+            Text to translate: "{text}"
+            
+            Instructions:
+            1. Maintain the original meaning and tone
+            2. Preserve any formatting markers or special characters
+            3. Keep the translation natural and fluent
+            4. If the text contains placeholders or variables, keep them unchanged
+            5. Return only the translated text, nothing else
+            
+            Translated text:
+            """
+
+PACKED_TRANSLATION_PROMPT = """
+            You are a professional translator. Translate every segment in the JSON array below to {target_language}.
+            
+            Context: {context}
+            
+            Segments: {payload}
+            
+            Instructions:
+            1. Maintain the original meaning and tone
+            2. Preserve any formatting markers or special characters
+            3. Keep the translation natural and fluent
+            4. If the text contains placeholders or variables, keep them unchanged
+            5. Translate each segment on its own; never merge, split or skip segments
+            6. Return only a JSON object mapping every segment id to its translated text, e.g. {{"0": "..."}}
+            """
+
+# Context used for slide text; legacy caches were all produced with it
+PRESENTATION_CONTEXT = "PowerPoint presentation content"
+NOTES_CONTEXT = "PowerPoint speaker notes"
+
+# Translation memory references are added to the prompt's context. They guide wording but do not
+# change what a correct translation is, so they are not part of the cache key.
+REFERENCE_NOTE = """{context}
+
+            Reference: a similar text was translated before. Keep its terminology and style where they apply.
+            Source: {source}
+            Translation: {translation}"""
+
+PACKED_REFERENCE_NOTE = """{context}
+
+            Some segments include a "reference": an earlier translation of a similar text. Keep its terminology and style where they apply."""
+
+# Cached translations are versioned by the prompt templates, so editing a prompt never serves stale entries
+PROMPT_VERSION = hashlib.sha1((TRANSLATION_PROMPT + PACKED_TRANSLATION_PROMPT).encode()).hexdigest()[:12]
+
+# (source hash, target language, model, prompt version, context hash)
+CacheKey = Tuple[str, str, str, str, str]
+CACHE_KEY_COLUMNS = ('source_hash', 'target_language', 'model', 'prompt_version', 'context_hash')
+
+# Translations imported from human-translated decks; they do not depend on the model, prompt or context
+HUMAN_MODEL = "human"
+
+def source_hash(text: str, target_language: str) -> str:
+    """Hash identifying a source text and target language in cache keys."""
+    return hashlib.md5(f"{text}_{target_language}".encode()).hexdigest()
+
+def context_hash(context: str) -> str:
+    """Short hash of a translation context string, used in cache keys."""
+    return hashlib.md5(context.encode()).hexdigest()[:16]
+
+def fragment_context(context: str) -> str:
+    """
+    Cache context of the pieces of a paragraph split for packing.
+    
+    Pieces are translated without the rest of their paragraph, so they are cached
+    apart from whole texts: only a split of the same paragraph ever reuses them.
+    """
+    return f"{context}\n(fragment of a longer text)"
+
+def default_cache_path() -> str:
+    """Location of the shared translation cache (PPTX_TRANSLATOR_CACHE overrides it)."""
+    return os.getenv('PPTX_TRANSLATOR_CACHE') or str(Path.home() / '.cache' / 'pptx-translator' / 'translation_cache.sqlite3')
+
+# Without file locks, another process's journal can never be proven abandoned, so it is left alone
+_FILE_LOCKS = fcntl is not None or msvcrt is not None
+
+def _lock_file(fileno: int) -> bool:
+    """
+    Take an exclusive lock on an open file without waiting.
+    
+    The operating system releases the lock when the file is closed, including when
+    its process dies, so a journal that can be locked belongs to a run that is over.
+    
+    Returns:
+        False if another open file, in this or any other process, holds the lock
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fileno, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            os.lseek(fileno, 0, os.SEEK_SET)
+            msvcrt.locking(fileno, msvcrt.LK_NBLCK, 1)
+        else:
+            return False
+    except OSError:
+        return False
+    return True
+
+class LRUCache:
+    """Size-bounded in-memory LRU map with byte accounting and hit/miss statistics."""
+    
+    # Approximate per-entry overhead of the OrderedDict node and key tuple
+    ENTRY_OVERHEAD = 200
+    
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the LRU.
+        
+        Args:
+            max_bytes: Approximate memory cap for keys and values (0 disables the tier)
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+    
+    def _entry_size(self, key: Tuple, value: str) -> int:
+        return sys.getsizeof(value) + sys.getsizeof(key[0]) + self.ENTRY_OVERHEAD
+    
+    def get(self, key: Tuple) -> Optional[str]:
+        """Look up a value and mark it most recently used."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key: Tuple, value: str):
+        """Store a value, evicting least recently used entries over the cap."""
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= self._entry_size(key, previous)
+        self._entries[key] = value
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old_key, old_value = self._entries.popitem(last=False)
+            self.bytes -= self._entry_size(old_key, old_value)
+            self.evictions += 1
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory use."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class CacheStatistics:
+    """Counters of how texts were served, with the API traffic the cache saved."""
+    
+    # Texts served without a request, by how they were found
+    HIT_COUNTERS = ('hits', 'human_hits', 'fallback_hits', 'normalized_hits', 'fuzzy_hits')
+    COUNTERS = ('lookups', *HIT_COUNTERS, 'misses', 'fuzzy_references', 'bytes_saved', 'tokens_saved')
+    
+    def __init__(self):
+        self.counts: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        self._unsaved: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+    
+    def record(self, counter: str, text: str = "", translation: str = ""):
+        """
+        Count one lookup outcome.
+        
+        Args:
+            counter: One of HIT_COUNTERS, 'misses' or 'fuzzy_references'
+            text: Source text, for the savings of a hit
+            translation: Translation served, for the savings of a hit
+        """
+        increments = {counter: 1}
+        if counter in self.HIT_COUNTERS:
+            # A hit saves sending the text and receiving its translation
+            increments['bytes_saved'] = len(text.encode('utf-8')) + len(translation.encode('utf-8'))
+            increments['tokens_saved'] = estimate_tokens(text) + estimate_tokens(translation)
+        if counter != 'fuzzy_references':
+            increments['lookups'] = 1
+        for name, value in increments.items():
+            self.counts[name] += value
+            self._unsaved[name] += value
+    
+    def take_unsaved(self) -> Dict[str, int]:
+        """Counts recorded since the last call, for accumulating elsewhere."""
+        unsaved = {name: value for name, value in self._unsaved.items() if value}
+        self._unsaved = dict.fromkeys(self.COUNTERS, 0)
+        return unsaved
+    
+    @classmethod
+    def summarize(cls, counts: Dict[str, int]) -> Dict[str, Any]:
+        """Counts plus the derived hit rate."""
+        hits = sum(counts.get(name, 0) for name in cls.HIT_COUNTERS)
+        lookups = counts.get('lookups', 0)
+        return {**{name: counts.get(name, 0) for name in cls.COUNTERS}, 'hit_rate': hits / lookups if lookups else 0.0}
+
+# Values that vary between otherwise identical slide texts; masked out of normalized cache keys
+_MASKABLE_RE = re.compile(
+    r'(?:https?://|www\.)\S+'                       # URLs
+    r'|\b\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}\b'          # Numeric dates
+    r'|\d+(?:[.,]\d+)*%?'                            # Numbers, amounts and percentages
+)
+_WHITESPACE_RE = re.compile(r'[\s\u00a0\u2007\u202f\u200b]+')
+# Placeholders are private-use characters, which never occur in real slide text or in the masked values
+_PLACEHOLDER_BASE = 0xE000
+_PLACEHOLDER_RE = re.compile('[\ue000-\uf8ff]')
+# Words (and numbers) of a text; unspaced scripts such as Chinese come out as one token per character
+_WORD_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]|[^\W_]+')
+
+def mask_text(text: str) -> Tuple[str, List[str]]:
+    """
+    Normalize a text for cache lookup: collapse whitespace and mask URLs, dates and numbers.
+    
+    Returns:
+        (masked text, masked values in order)
+    """
+    values = []
+    
+    def placeholder(match):
+        values.append(match.group(0))
+        return chr(_PLACEHOLDER_BASE + len(values) - 1)
+    
+    collapsed = _WHITESPACE_RE.sub(' ', text).strip()
+    return _MASKABLE_RE.sub(placeholder, collapsed), values
+
+def mask_translation(translation: str, values: List[str]) -> Optional[str]:
+    """
+    Replace the source's masked values in a translation with placeholders.
+    
+    Returns:
+        Masked translation, or None if the model did not copy every value verbatim
+    """
+    for index, value in enumerate(values):
+        if value not in translation:
+            return None
+        translation = translation.replace(value, chr(_PLACEHOLDER_BASE + index), 1)
+    return translation
+
+def unmask_translation(masked: str, values: List[str]) -> Optional[str]:
+    """Put a text's values into a masked translation; None if the placeholders don't match."""
+    placeholders = [chr(_PLACEHOLDER_BASE + index) for index in range(len(values))]
+    if len(_PLACEHOLDER_RE.findall(masked)) != len(values) or any(placeholder not in masked for placeholder in placeholders):
+        return None
+    for placeholder, value in zip(placeholders, values):
+        masked = masked.replace(placeholder, value)
+    return masked
+
+class TranslationCache:
+    """
+    Translation cache shared by every file and process.
+    
+    A size-bounded in-memory LRU sits in front of a single SQLite database (WAL mode).
+    Longer translations are stored zlib-compressed, optionally with a shared
+    dictionary trained on the cache's own content.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS variants (
+            id INTEGER PRIMARY KEY,
+            target_language TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            context_hash TEXT NOT NULL,
+            UNIQUE (target_language, model, prompt_version, context_hash)
+        );
+        CREATE TABLE IF NOT EXISTS translations (
+            source_hash BLOB NOT NULL,
+            variant INTEGER NOT NULL,
+            translation TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_used_at INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source_hash, variant)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS imported_files (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY,
+            dictionary BLOB NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS statistics (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+    SCHEMA_VERSION = 4
+    # Rows store the binary source hash and the ID of the key's (language, model, prompt, context) variant
+    KEY_WHERE = "source_hash = ? AND variant = ?"
+    VARIANT_COLUMNS = CACHE_KEY_COLUMNS[1:]
+    # Shorter translations do not shrink when compressed, so they are stored as text
+    COMPRESS_MIN_BYTES = 64
+    
+    def __init__(self, path: Optional[str] = None, flush_every: int = 500, fsync_every: int = 32, fsync_interval: float = 1.0,
+                 memory_limit: int = 64 * 1024 * 1024, compress: bool = True):
+        """
+        Initialize the cache. The database is opened on first use.
+        
+        Every new translation is appended to a per-process journal as soon as it
+        completes, so a killed run loses nothing; the journal is compacted into
+        the database every ``flush_every`` entries and replayed on the next start.
+        
+        Args:
+            path: SQLite database file (default: default_cache_path())
+            flush_every: Number of journaled writes that triggers a compaction into the database
+            fsync_every: Number of journaled writes per fsync
+            fsync_interval: Maximum seconds between fsyncs while writing
+            memory_limit: Approximate bytes held by the in-memory LRU tier
+            compress: Store new translations of COMPRESS_MIN_BYTES or more zlib-compressed
+                (existing entries are read either way)
+        """
+        self.path = path or default_cache_path()
+        self.flush_every = flush_every
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        # Unique per instance: PIDs are reused, and two caches in one process must not share a journal
+        self.journal_path = f"{self.path}.{os.getpid()}-{os.urandom(4).hex()}.journal"
+        self._conn = None
+        self._journal = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._pending: Dict[CacheKey, str] = {}
+        self._used: Dict[CacheKey, int] = {}
+        self.memory = LRUCache(memory_limit)
+        self.compress = compress
+        self._dictionaries: Optional[Dict[int, bytes]] = None
+        self._variants: Dict[Tuple[str, str, str, str], int] = {}
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate()
+            self._conn.executescript(self.SCHEMA)
+            # Version 2 indexed last use, which doubled the size of the key data; only compaction scans it
+            self._conn.execute("DROP INDEX IF EXISTS translations_last_used")
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._recover_journals()
+        return self._conn
+    
+    def _migrate(self):
+        """Upgrade a database with text keys (versions 1 to 3) in place."""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(translations)")]
+        if not columns or 'variant' in columns:
+            return
+        
+        logger.info("Upgrading translation cache schema (binary hashes and shared key variants)")
+        with self._conn:
+            self._conn.execute("DROP INDEX IF EXISTS translations_last_used")
+            self._conn.execute("ALTER TABLE translations RENAME TO translations_old")
+            self._conn.executescript(self.SCHEMA)
+            # Version 1 had no context in the key; its entries were made with the current prompts ("1") for slide text
+            context = 'context_hash' if 'context_hash' in columns else '?'
+            rows = self._conn.execute(
+                f"""
+                SELECT source_hash, target_language, model,
+                       CASE prompt_version WHEN '1' THEN ? ELSE prompt_version END, {context},
+                       translation, created_at, last_used_at, hits
+                FROM translations_old
+                """,
+                (PROMPT_VERSION,) if context == 'context_hash' else (PROMPT_VERSION, context_hash(PRESENTATION_CONTEXT))
+            )
+            while True:
+                batch = rows.fetchmany(1000)
+                if not batch:
+                    break
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*self._row_key(row[:5], create=True), row[5], int(row[6]), int(row[7]), row[8]) for row in batch]
+                )
+            self._conn.execute("DROP TABLE translations_old")
+    
+    def _variant_id(self, variant: Tuple[str, str, str, str], create: bool = False) -> Optional[int]:
+        """
+        ID of a (target language, model, prompt version, context hash) combination.
+        
+        Args:
+            variant: Cache key without the source hash
+            create: Add the combination if it is new (inside the caller's transaction)
+            
+        Returns:
+            ID, or None if the combination is new and create is False
+        """
+        variant_id = self._variants.get(variant)
+        if variant_id is None:
+            where = " AND ".join(f"{column} = ?" for column in self.VARIANT_COLUMNS)
+            row = self.conn.execute(f"SELECT id FROM variants WHERE {where}", variant).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                self.conn.execute(f"INSERT OR IGNORE INTO variants ({', '.join(self.VARIANT_COLUMNS)}) VALUES (?, ?, ?, ?)", variant)
+                row = self.conn.execute(f"SELECT id FROM variants WHERE {where}", variant).fetchone()
+            variant_id = self._variants[variant] = row[0]
+        return variant_id
+    
+    def _row_key(self, key: CacheKey, create: bool = False) -> Optional[Tuple[bytes, int]]:
+        """Primary key of a cache key's row (see _variant_id); None if no row can have it."""
+        variant_id = self._variant_id(tuple(key[1:]), create)
+        return None if variant_id is None else (bytes.fromhex(key[0]), variant_id)
+    
+    @property
+    def dictionaries(self) -> Dict[int, bytes]:
+        """Compression dictionaries by ID; the highest ID is used for new entries."""
+        if self._dictionaries is None:
+            self._dictionaries = dict(self.conn.execute("SELECT id, dictionary FROM compression_dictionaries"))
+        return self._dictionaries
+    
+    def _dictionary(self, dictionary_id: int) -> bytes:
+        """A compression dictionary, reloading them if another process trained a new one."""
+        dictionary = self.dictionaries.get(dictionary_id)
+        if dictionary is None:
+            self._dictionaries = None
+            dictionary = self.dictionaries[dictionary_id]
+        return dictionary
+    
+    def _encode(self, translation: str):
+        """
+        Encode a translation for storage.
+        
+        Returns:
+            The text itself, or a blob of the 2-byte dictionary ID (0 for none)
+            followed by raw deflate data
+        """
+        data = translation.encode('utf-8')
+        if not self.compress or len(data) < self.COMPRESS_MIN_BYTES:
+            return translation
+        dictionary_id = max(self.dictionaries, default=0)
+        if dictionary_id:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=self.dictionaries[dictionary_id])
+        else:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        packed = dictionary_id.to_bytes(2, 'big') + compressor.compress(data) + compressor.flush()
+        return packed if len(packed) < len(data) else translation
+    
+    def _decode(self, value) -> str:
+        """Decode a stored translation (see _encode)."""
+        if isinstance(value, str):
+            return value
+        dictionary_id = int.from_bytes(value[:2], 'big')
+        if dictionary_id:
+            decompressor = zlib.decompressobj(-15, zdict=self._dictionary(dictionary_id))
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(value[2:]) + decompressor.flush()).decode('utf-8')
+    
+    def _recover_journals(self):
+        """Replay journals left behind by runs that did not finish (nobody holds their lock)."""
+        if not _FILE_LOCKS:
+            return
+        cache_path = Path(self.path)
+        for journal in sorted(cache_path.parent.glob(f"{cache_path.name}.*.journal")):
+            if str(journal) == self.journal_path:
+                continue
+            try:
+                with open(journal, 'r', encoding='utf-8') as f:
+                    if not _lock_file(f.fileno()):
+                        continue  # Its run is still going
+                    entries = {}
+                    for line in f:
+                        try:
+                            *key, translation = json.loads(line)
+                        except ValueError:
+                            break  # Torn last line of a crashed write
+                        if len(key) == len(CACHE_KEY_COLUMNS):
+                            entries[tuple(key)] = translation
+                    if entries:
+                        self._write_translations(entries)
+                        logger.info(f"Recovered {len(entries)} translations from unfinished run ({journal.name})")
+                journal.unlink()
+            except OSError as e:
+                # Another process may be recovering or creating the same file right now
+                logger.debug(f"Skipped journal {journal.name}: {e}")
+    
+    def _open_journal(self):
+        """Create this cache's journal, locked for as long as it is open (see _lock_file)."""
+        while True:
+            journal = open(self.journal_path, 'a', encoding='utf-8')
+            if not _FILE_LOCKS:
+                return journal
+            try:
+                if _lock_file(journal.fileno()) and os.path.samestat(os.fstat(journal.fileno()), os.stat(self.journal_path)):
+                    return journal
+            except FileNotFoundError:
+                pass
+            # Another process took the new file for abandoned before it was locked; start over
+            journal.close()
+    
+    def _append_journal(self, key: CacheKey, translation: str):
+        """Record one translation durably (fsync is batched)."""
+        if self._journal is None:
+            self.conn  # Recover older journals before starting a new one
+            self._journal = self._open_journal()
+        self._journal.write(json.dumps([*key, translation], ensure_ascii=False) + "\n")
+        # Reaching the OS is enough to survive the process being killed; fsync covers power loss
+        self._journal.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync_journal()
+    
+    def _sync_journal(self):
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def _lookup(self, key: CacheKey) -> Optional[str]:
+        translation = self.memory.get(key)
+        if translation is not None:
+            return translation
+        translation = self._pending.get(key)
+        if translation is None:
+            row_key = self._row_key(key)
+            row = row_key and self.conn.execute(f"SELECT translation FROM translations WHERE {self.KEY_WHERE}", row_key).fetchone()
+            if row is None:
+                return None
+            translation = self._decode(row[0])
+        self.memory.put(key, translation)
+        return translation
+    
+    def get(self, key: CacheKey, default: Optional[str] = None) -> Optional[str]:
+        """Look up one translation and record the use."""
+        translation = self._lookup(key)
+        if translation is None:
+            return default
+        self._used[key] = self._used.get(key, 0) + 1
+        if len(self._used) >= self.flush_every:
+            self.flush()
+        return translation
+    
+    def get_from_other_models(self, key: CacheKey, models: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Look up a translation of the same text, prompt and context made by another model.
+        
+        Args:
+            key: Cache key for the current model
+            models: Models to try, in order (None for any model, most recently used first)
+            
+        Returns:
+            Translation, or None if no other model has one
+        """
+        source_hash, target_language, model, prompt_version, context = key
+        if models is not None:
+            for other in models:
+                if other != model:
+                    translation = self._lookup((source_hash, target_language, other, prompt_version, context))
+                    if translation is not None:
+                        return translation
+            return None
+        
+        self.flush()
+        row = self.conn.execute(
+            """
+            SELECT translation FROM translations JOIN variants ON variants.id = translations.variant
+            WHERE source_hash = ? AND target_language = ? AND model != ? AND prompt_version = ? AND context_hash = ?
+            ORDER BY last_used_at DESC LIMIT 1
+            """,
+            (bytes.fromhex(source_hash), target_language, model, prompt_version, context)
+        ).fetchone()
+        return self._decode(row[0]) if row else None
+    
+    def __contains__(self, key: CacheKey) -> bool:
+        return self._lookup(key) is not None
+    
+    def __getitem__(self, key: CacheKey) -> str:
+        translation = self.get(key)
+        if translation is None:
+            raise KeyError(key)
+        return translation
+    
+    def __setitem__(self, key: CacheKey, translation: str):
+        self._append_journal(key, translation)
+        self._pending[key] = translation
+        self.memory.put(key, translation)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+    
+    def __len__(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+    
+    def _write_translations(self, entries: Dict[CacheKey, str]):
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO translations (source_hash, variant, translation, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source_hash, variant)
+                DO UPDATE SET translation = excluded.translation, last_used_at = excluded.last_used_at
+                """,
+                [(*self._row_key(key, create=True), self._encode(translation), now, now) for key, translation in entries.items()]
+            )
+    
+    def flush(self):
+        """Compact journaled translations and usage statistics into the database."""
+        if self._pending:
+            self._write_translations(self._pending)
+            self._pending.clear()
+            # Everything journaled so far is now in the database
+            if self._journal is not None:
+                self._journal.truncate(0)
+                self._unsynced = 0
+        
+        if self._used:
+            now = int(time.time())
+            with self.conn:
+                row_keys = [(count, self._row_key(key)) for key, count in self._used.items()]
+                self.conn.executemany(
+                    f"UPDATE translations SET hits = hits + ?, last_used_at = ? WHERE {self.KEY_WHERE}",
+                    [(count, now, *row_key) for count, row_key in row_keys if row_key]
+                )
+            self._used.clear()
+    
+    def compact(self, older_than: Optional[float] = None, unused_for: Optional[float] = None,
+                models: Optional[List[str]] = None, stale_prompts: bool = False) -> int:
+        """
+        Delete entries matching any of the given criteria and reclaim the space.
+        
+        Args:
+            older_than: Drop entries created more than this many seconds ago
+            unused_for: Drop entries not used for this many seconds
+            models: Drop every entry made by these models
+            stale_prompts: Drop entries made with other prompt templates than the current ones
+                (human translations are kept)
+            
+        Returns:
+            Number of entries removed
+        """
+        self.flush()
+        now = time.time()
+        conditions, params = [], []
+        if older_than is not None:
+            conditions.append("created_at < ?")
+            params.append(now - older_than)
+        if unused_for is not None:
+            conditions.append("last_used_at < ?")
+            params.append(now - unused_for)
+        if models:
+            conditions.append(f"variant IN (SELECT id FROM variants WHERE model IN ({', '.join('?' * len(models))}))")
+            params.extend(models)
+        if stale_prompts:
+            conditions.append("variant IN (SELECT id FROM variants WHERE prompt_version != ? AND model != ?)")
+            params.extend((PROMPT_VERSION, HUMAN_MODEL))
+        if not conditions:
+            return 0
+        
+        with self.conn:
+            removed = self.conn.execute(f"DELETE FROM translations WHERE {' OR '.join(conditions)}", params).rowcount
+        if removed:
+            self.memory = LRUCache(self.memory.max_bytes)
+            self.vacuum()
+        return removed
+    
+    def vacuum(self):
+        """Rebuild the database file to give the space of deleted or shrunk entries back."""
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def add_statistics(self, counts: Dict[str, int]):
+        """Add a run's counters to the cumulative statistics."""
+        if not counts:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO statistics (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                counts.items()
+            )
+    
+    def statistics(self) -> Dict[str, int]:
+        """Cumulative counters of every run that used this cache."""
+        return dict(self.conn.execute("SELECT name, value FROM statistics"))
+    
+    EXPORT_COLUMNS = (*CACHE_KEY_COLUMNS, 'translation', 'created_at', 'last_used_at', 'hits')
+    
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Stream every entry with its usage statistics."""
+        self.flush()
+        for row in self.conn.execute(f"SELECT {', '.join(self.EXPORT_COLUMNS)} FROM translations JOIN variants ON variants.id = translations.variant"):
+            entry = dict(zip(self.EXPORT_COLUMNS, row))
+            entry['source_hash'] = entry['source_hash'].hex()
+            entry['translation'] = self._decode(entry['translation'])
+            yield entry
+    
+    def import_entries(self, entries: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Merge exported entries into the cache.
+        
+        When both sides have an entry, the more recently used translation wins
+        and usage statistics are combined.
+        
+        Returns:
+            Number of entries read
+        """
+        self.flush()
+        now = time.time()
+        count = 0
+        batch = []
+        
+        def write():
+            with self.conn:
+                self.conn.executemany(
+                    """
+                    INSERT INTO translations (source_hash, variant, translation, created_at, last_used_at, hits)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (source_hash, variant) DO UPDATE SET
+                        translation = CASE WHEN excluded.last_used_at > last_used_at THEN excluded.translation ELSE translation END,
+                        created_at = min(created_at, excluded.created_at),
+                        last_used_at = max(last_used_at, excluded.last_used_at),
+                        hits = max(hits, excluded.hits)
+                    """,
+                    batch
+                )
+            batch.clear()
+        
+        for entry in entries:
+            # New variants are committed with the batch that first uses them
+            key = tuple(entry[column] for column in CACHE_KEY_COLUMNS)
+            batch.append((*self._row_key(key, create=True), self._encode(entry['translation']),
+                          int(entry.get('created_at', now)), int(entry.get('last_used_at', now)), entry.get('hits', 0)))
+            count += 1
+            if len(batch) >= batch_size:
+                write()
+        if batch:
+            write()
+        self.memory = LRUCache(self.memory.max_bytes)
+        return count
+
+    def train_dictionary(self, sample_size: int = 5000, dictionary_size: int = 32 * 1024) -> int:
+        """
+        Build a compression dictionary from the cache's own translations and recompress every entry with it.
+        
+        The dictionary is the most frequent words and word pairs of a random sample;
+        zlib uses it as shared history, which is what makes short entries compress.
+        
+        Args:
+            sample_size: Number of translations sampled
+            dictionary_size: Dictionary size in bytes (zlib uses at most 32 KB)
+        
+        Returns:
+            Number of entries recompressed
+        """
+        self.flush()
+        counts: Dict[str, int] = {}
+        for (value,) in self.conn.execute("SELECT translation FROM translations ORDER BY random() LIMIT ?", (sample_size,)):
+            tokens = re.findall(r'\S+\s*', self._decode(value))
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for pair in zip(tokens, tokens[1:]):
+                phrase = ''.join(pair)
+                counts[phrase] = counts.get(phrase, 0) + 1
+        
+        # Best candidates are frequent and long; zlib reaches the end of the dictionary most cheaply
+        candidates = sorted((phrase for phrase, count in counts.items() if count > 1),
+                            key=lambda phrase: counts[phrase] * len(phrase.encode('utf-8')), reverse=True)
+        chosen, size = [], 0
+        for phrase in candidates:
+            data = phrase.encode('utf-8')
+            if size + len(data) > dictionary_size:
+                continue
+            chosen.append(data)
+            size += len(data)
+        if not chosen:
+            return 0
+        dictionary = b''.join(reversed(chosen))
+        
+        with self.conn:
+            self.conn.execute("INSERT INTO compression_dictionaries (dictionary, created_at) VALUES (?, ?)", (dictionary, time.time()))
+        self._dictionaries = None
+        
+        # Recompress in primary key order, one batch at a time
+        recompressed = 0
+        last_key = None
+        while True:
+            rows = self.conn.execute(
+                "SELECT source_hash, variant, translation FROM translations"
+                + (" WHERE (source_hash, variant) > (?, ?)" if last_key else "")
+                + " ORDER BY source_hash, variant LIMIT 1000",
+                last_key or ()
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for *key, value in rows:
+                if not isinstance(value, str) or len(value.encode('utf-8')) >= self.COMPRESS_MIN_BYTES:
+                    encoded = self._encode(self._decode(value))
+                    if encoded != value:
+                        updates.append((encoded, *key))
+            with self.conn:
+                self.conn.executemany(f"UPDATE translations SET translation = ? WHERE {self.KEY_WHERE}", updates)
+            recompressed += len(updates)
+            last_key = rows[-1][:2]
+        
+        # Older dictionaries are kept: processes that loaded them before this one was
+        # trained still compress new entries with them until they reload
+        self._dictionaries = None
+        self.vacuum()
+        logger.info(f"Trained a {len(dictionary)} byte compression dictionary from {len(counts)} phrases")
+        return recompressed
+
+    def import_json(self, json_file: str, target_language: str, model: str, prompt_version: str = PROMPT_VERSION,
+                    context: str = PRESENTATION_CONTEXT) -> int:
+        """
+        Import a legacy per-file JSON cache (``{source_hash: translation}``).
+        
+        Files are imported once; a file is imported again only if it changed.
+        
+        Returns:
+            Number of entries imported
+        """
+        path = str(Path(json_file).resolve())
+        mtime = os.path.getmtime(path)
+        row = self.conn.execute("SELECT mtime FROM imported_files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == mtime:
+            return 0
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        
+        self.flush()
+        now = int(time.time())
+        with self.conn:
+            # Existing entries win: they may come from a newer run than the legacy file
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO translations (source_hash, variant, translation, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [(*self._row_key((source_hash, target_language, model, prompt_version, context_hash(context)), create=True),
+                  self._encode(translation), now, now)
+                 for source_hash, translation in entries.items() if isinstance(translation, str)]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO imported_files (path, mtime) VALUES (?, ?)", (path, mtime))
+        return len(entries)
+    
+    def close(self):
+        """Flush pending writes, remove the journal and close the database."""
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            os.remove(self.journal_path)
+
+# (similarity, source text, translation) of the closest translation memory entry
+MemoryMatch = Tuple[float, str, str]
+
+class TranslationMemory:
+    """
+    Fuzzy translation memory: finds earlier translations of texts similar to a new one.
+    
+    Texts are indexed by MinHash signatures of their character trigrams, split into
+    LSH bands stored next to the translation cache. A lookup reads one bucket per
+    band and level and checks only the few candidates that share the most bands.
+    A bucket that fills up is closed and later texts go one level down, keyed by the
+    next bands' values too, so no bucket read by a lookup holds more than
+    BUCKET_LIMIT texts.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tm_segments (
+            id INTEGER PRIMARY KEY,
+            source_hash TEXT NOT NULL,
+            target_language TEXT NOT NULL,
+            source_text TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            UNIQUE (source_hash, target_language)
+        );
+        CREATE TABLE IF NOT EXISTS tm_index (
+            band_hash INTEGER NOT NULL,
+            segment_id INTEGER NOT NULL,
+            PRIMARY KEY (band_hash, segment_id)
+        ) WITHOUT ROWID;
+    """
+    # 32 bands of 6 MinHash values: wide bands keep buckets of templated text small, and the
+    # many bands still find near-duplicates (see bench_translation_memory in benchmark.py)
+    BANDS = 32
+    ROWS = 6
+    # Shorter texts share too few trigrams for a meaningful similarity
+    MIN_LENGTH = 20
+    MAX_CANDIDATES = 4
+    # A bucket shared by this many texts (trigrams of a common template, say) is closed: a single
+    # FULL_BUCKET row replaces it, and later texts of that band go one level down, keyed by the
+    # next bands' values as well. Near-duplicates share those values too, so they still meet.
+    BUCKET_LIMIT = 128
+    MAX_LEVEL = 2
+    FULL_BUCKET = 0
+    
+    def __init__(self, cache: TranslationCache, threshold: float = 0.85, flush_every: int = 200):
+        """
+        Initialize the translation memory.
+        
+        Args:
+            cache: Translation cache whose database stores the memory
+            threshold: Minimum similarity (0-1) of a match
+            flush_every: Number of buffered texts that triggers a write to the database
+        """
+        self.cache = cache
+        self.threshold = threshold
+        self.flush_every = flush_every
+        self._pending: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._ready = False
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The cache database, with the memory tables created on first use."""
+        conn = self.cache.conn
+        if not self._ready:
+            conn.executescript(self.SCHEMA)
+            self._ready = True
+            old_tables = [name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE name IN ('tm_bands', 'tm_buckets')")]
+            if old_tables:
+                self._rebuild_index(old_tables)
+        return conn
+    
+    def _rebuild_index(self, old_tables: List[str]):
+        """Re-index a memory written by an older version (uncapped or single-level buckets)."""
+        conn = self.cache.conn
+        logger.info("Rebuilding translation memory index with leveled LSH buckets")
+        with conn:
+            conn.execute("DELETE FROM tm_index")
+            for segment_id, target_language, text in conn.execute("SELECT id, target_language, source_text FROM tm_segments").fetchall():
+                self._index(segment_id, target_language, text)
+            for table in old_tables:
+                conn.execute(f"DROP TABLE {table}")
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return _WHITESPACE_RE.sub(' ', text).strip()
+    
+    def signature(self, text: str) -> Optional[List[int]]:
+        """
+        MinHash signature of a text's lowercased character trigrams.
+        
+        Uses one-permutation hashing: each trigram is hashed once and its hash picks
+        a bin and the value competing for that bin's minimum. Empty bins borrow the
+        value of the next filled bin, so short texts still get a full signature.
+        
+        Returns:
+            BANDS * ROWS values, or None if the text is too short
+        """
+        normalized = self._normalize(text).lower()
+        if len(normalized) < self.MIN_LENGTH:
+            return None
+        size = self.BANDS * self.ROWS
+        hashes = {zlib.crc32(normalized[start:start + 3].encode('utf-8')) for start in range(len(normalized) - 2)}
+        # In descending order the smallest value of each bin is written last
+        filled = {value % size: value // size for value in sorted(hashes, reverse=True)}
+        bins: List[Optional[int]] = [filled.get(slot) for slot in range(size)]
+        
+        # Fill empty bins from the next filled one (the offset keeps borrowed values distinct)
+        for slot in range(size):
+            if bins[slot] is None:
+                distance = 1
+                while bins[(slot + distance) % size] is None:
+                    distance += 1
+                bins[slot] = -(bins[(slot + distance) % size] + 1) * size - distance
+        return bins
+    
+    def _band_keys(self, target_language: str, signature: List[int]) -> List[List[int]]:
+        """
+        Bucket keys of a signature.
+        
+        Returns:
+            For each band, its key at levels 0 to MAX_LEVEL; level n also covers the
+            values of the n bands after it
+        """
+        packed = struct.pack(f'<{len(signature)}q', *signature)
+        width = self.ROWS * 8
+        prefix = target_language.encode('utf-8') + b'|'
+        bases = [hashlib.blake2b(prefix + packed[band * width:(band + 1) * width], digest_size=8, salt=band.to_bytes(2, 'big')).digest()
+                 for band in range(self.BANDS)]
+        keys = []
+        for band, digest in enumerate(bases):
+            levels = [int.from_bytes(digest, 'big', signed=True)]
+            for level in range(1, self.MAX_LEVEL + 1):
+                digest = hashlib.blake2b(digest + bases[(band + level) % self.BANDS], digest_size=8).digest()
+                levels.append(int.from_bytes(digest, 'big', signed=True))
+            keys.append(levels)
+        return keys
+    
+    def add(self, text: str, target_language: str, translation: str):
+        """Remember a translation (written to the database in batches)."""
+        if len(self._normalize(text)) < self.MIN_LENGTH:
+            return
+        self._pending[(source_hash(text, target_language), target_language)] = (text, translation)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+    
+    def _index(self, segment_id: int, target_language: str, text: str):
+        """Add a stored text to one bucket of each of its LSH bands."""
+        for levels in self._band_keys(target_language, self.signature(text)):
+            self._insert(segment_id, levels)
+    
+    def _insert(self, segment_id: int, levels: List[int]):
+        """Add a text to the first of a band's buckets that is not full, closing a bucket that fills up."""
+        conn = self.cache.conn
+        for level, key in enumerate(levels):
+            # Segment IDs start at 1, so a full bucket's marker row comes first
+            first, size = conn.execute(
+                "SELECT MIN(segment_id), COUNT(*) FROM (SELECT segment_id FROM tm_index WHERE band_hash = ? LIMIT ?)",
+                (key, self.BUCKET_LIMIT)
+            ).fetchone()
+            if first == self.FULL_BUCKET:
+                continue
+            if size < self.BUCKET_LIMIT:
+                conn.execute("INSERT OR IGNORE INTO tm_index (band_hash, segment_id) VALUES (?, ?)", (key, segment_id))
+                return
+            conn.execute("DELETE FROM tm_index WHERE band_hash = ?", (key,))
+            conn.execute("INSERT INTO tm_index (band_hash, segment_id) VALUES (?, ?)", (key, self.FULL_BUCKET))
+    
+    def flush(self):
+        """Write buffered texts and their LSH bands to the database."""
+        if not self._pending:
+            return
+        with self.conn:
+            for (text_hash, target_language), (text, translation) in self._pending.items():
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO tm_segments (source_hash, target_language, source_text, translation) VALUES (?, ?, ?, ?)",
+                    (text_hash, target_language, text, translation)
+                )
+                if cursor.rowcount:
+                    self._index(cursor.lastrowid, target_language, text)
+                else:
+                    self.conn.execute(
+                        "UPDATE tm_segments SET translation = ? WHERE source_hash = ? AND target_language = ?",
+                        (translation, text_hash, target_language)
+                    )
+        self._pending.clear()
+    
+    @staticmethod
+    def same_words(text: str, other: str) -> bool:
+        """Whether two texts differ only in case, whitespace and punctuation."""
+        return _WORD_RE.findall(text.casefold()) == _WORD_RE.findall(other.casefold())
+    
+    def lookup(self, text: str, target_language: str) -> Optional[MemoryMatch]:
+        """
+        Find the most similar remembered text.
+        
+        Similarity is difflib's ratio of the whitespace-normalized texts.
+        
+        Returns:
+            (similarity, source text, translation) of the best match at or above the
+            threshold, or None
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        # Texts translated earlier in this run are matched too
+        self.flush()
+        # Buckets hold at most BUCKET_LIMIT rows, so this reads a bounded number of index entries;
+        # a text is in one level per band, so it is counted once per band it shares
+        keys = [key for levels in self._band_keys(target_language, signature) for key in levels]
+        shared = dict(self.conn.execute(
+            f"""SELECT segment_id, COUNT(*) AS bands FROM tm_index
+                WHERE band_hash IN ({', '.join('?' * len(keys))}) AND segment_id != ?
+                GROUP BY segment_id ORDER BY bands DESC LIMIT ?""",
+            (*keys, self.FULL_BUCKET, self.MAX_CANDIDATES)
+        ).fetchall())
+        if not shared:
+            return None
+        candidates = list(shared)
+        segments = {segment_id: (source_text, translation) for segment_id, source_text, translation in self.conn.execute(
+            f"SELECT id, source_text, translation FROM tm_segments WHERE id IN ({', '.join('?' * len(candidates))}) AND target_language = ?",
+            (*candidates, target_language)
+        )}
+        
+        normalized = self._normalize(text)
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(normalized)
+        best = None
+        best_shared = 0
+        for segment_id in candidates:
+            if segment_id not in segments:
+                continue
+            # Sharing fewer bands than the best match so far means a lower estimated similarity
+            if shared[segment_id] < best_shared:
+                break
+            source_text, translation = segments[segment_id]
+            matcher.set_seq1(self._normalize(source_text))
+            floor = best[0] if best else self.threshold
+            # The quick upper bounds skip candidates that cannot beat the current best
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            score = matcher.ratio()
+            if score >= floor:
+                best = (score, source_text, translation)
+                best_shared = shared[segment_id]
+        return best
+    
+    def __len__(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COUNT(*) FROM tm_segments").fetchone()[0]
+    
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Stream every remembered text and its translation."""
+        self.flush()
+        for text, target_language, translation in self.conn.execute(
+                "SELECT source_text, target_language, translation FROM tm_segments"):
+            yield {'source_text': text, 'target_language': target_language, 'translation': translation}
+
 class GeminiTranslator:
     """Gemini API translator for PowerPoint presentations."""
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash"):
+    def __init__(self, api_key: str, model: str = "gemini-2.5-flash", concurrency: int = 1, batch_size: int = 1, max_pack_attempts: int = 2, max_input_tokens: int = 2000, max_output_tokens: int = 4000,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: Optional[int] = None, max_retries: int = 3, retry_budget: float = 0.2,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0, breaker_fail_fast: bool = False,
+                 pool_size: Optional[int] = None, async_client: bool = False, cache_path: Optional[str] = None,
+                 cache_memory_mb: float = 64,
+                 cache_fallback_models: Optional[List[str]] = None, normalize_cache_keys: bool = True,
+                 fuzzy_threshold: float = 0.85, fuzzy_reuse_threshold: float = 0.99):
         """
         Initialize the Gemini translator.
         
         Args:
             api_key: Gemini API key
             model: Gemini model to use (default: gemini-1.5-flash)
+            concurrency: Number of translation requests in flight per batch to start with
+            batch_size: Number of segments packed into one request (1 disables packing)
+            max_pack_attempts: How many times missing segments of a packed request are re-sent
+            max_input_tokens: Estimated input token budget for one packed request
+            max_output_tokens: Estimated output token budget for one packed request
+            requests_per_minute: Request quota override (default: per-model default)
+            tokens_per_minute: Input token quota override (default: per-model default)
+            max_concurrency: Limit the adaptive controller may grow to (default: derived from the
+                model's request quota, see default_max_concurrency)
+            max_retries: How many times a request is retried after a retryable error
+            retry_budget: Retries allowed per request sent over the whole run
+            breaker_threshold: Consecutive API failures that open the circuit breaker (0 disables it)
+            breaker_reset: Seconds the circuit stays open before a probe request
+            breaker_fail_fast: Keep the original text while the circuit is open instead of pausing
+                the queue until a probe succeeds
+            pool_size: Worker threads for blocking Gemini calls (default: max concurrency, at least 4)
+            async_client: Use the client's native async API instead of the thread pool
+            cache_path: SQLite translation cache shared across files (default: default_cache_path())
+            cache_memory_mb: Memory cap of the in-memory LRU tier in front of the cache
+            cache_fallback_models: On a cache miss, reuse translations made by these models
+                (an empty list means any model; None disables the fallback)
+            normalize_cache_keys: Also match cached texts that differ only in whitespace, numbers, dates or URLs
+            fuzzy_threshold: Minimum similarity of a translation memory match passed to Gemini as a reference (0 disables the memory)
+            fuzzy_reuse_threshold: Similarity at which a translation memory match is reused without a request
         """
         self.api_key = api_key
         self.model = model
-        self.cache = {}
-        self.cache_file = None
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_pack_attempts = max(1, max_pack_attempts)
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.rate_limiter = get_rate_limiter(model, requests_per_minute, tokens_per_minute)
+        self.max_concurrency = max(self.concurrency, max_concurrency or default_max_concurrency(self.rate_limiter.requests.rate * 60))
+        self.max_retries = max(0, max_retries)
+        self.retry_budget = RetryBudget(retry_budget)
+        self.untranslated_count = 0
+        self.circuit_breaker = CircuitBreaker(breaker_threshold, breaker_reset, pause=not breaker_fail_fast)
+        self.pool_size = max(1, pool_size or max(self.max_concurrency, 4))
+        self.async_client = async_client
+        self._executor = None
+        self._models = {}
+        self._in_flight: Dict[CacheKey, asyncio.Future] = {}
+        self.concurrency_controller = AdaptiveConcurrency(self.concurrency, self.max_concurrency)
+        self.cache = TranslationCache(cache_path, memory_limit=int(cache_memory_mb * 1024 * 1024))
+        self.cache_fallback_models = cache_fallback_models
+        self.normalize_cache_keys = normalize_cache_keys
+        self.translation_memory = TranslationMemory(self.cache, fuzzy_threshold) if fuzzy_threshold > 0 else None
+        self.fuzzy_reuse_threshold = fuzzy_reuse_threshold
+        self.stats = CacheStatistics()
         
         # Configure Gemini
         genai.configure(api_key=api_key)
         
-        # Available Gemini models (as of 2025)
-        self.available_models = {
-            "gemini-2.5-flash": "Latest Gemini 2.5 flash model (fastest and most efficient)",
-            "gemini-2.5-pro": "Latest Gemini 2.5 pro model (most capable)",
-            "gemini-2.0-flash-exp": "Previous experimental flash model",
-            "gemini-2.0-flash": "Previous stable flash model",
-            "gemini-2.0-pro": "Previous pro model",
-            "gemini-1.5-flash": "Legacy flash model",
-            "gemini-1.5-pro": "Legacy pro model",
-            "gemini-1.5-flash-exp": "Legacy experimental flash",
-            "gemini-1.5-pro-exp": "Legacy experimental pro"
-        }
+        # Available Gemini models (as of 2025)
+        self.available_models = {
+            "gemini-2.5-flash": "Latest Gemini 2.5 flash model (fastest and most efficient)",
+            "gemini-2.5-pro": "Latest Gemini 2.5 pro model (most capable)",
+            "gemini-2.0-flash-exp": "Previous experimental flash model",
+            "gemini-2.0-flash": "Previous stable flash model",
+            "gemini-2.0-pro": "Previous pro model",
+            "gemini-1.5-flash": "Legacy flash model",
+            "gemini-1.5-pro": "Legacy pro model",
+            "gemini-1.5-flash-exp": "Legacy experimental flash",
+            "gemini-1.5-pro-exp": "Legacy experimental pro"
+        }
+        
+        if model not in self.available_models:
+            logger.warning(f"Model {model} not in known models. Available: {list(self.available_models.keys())}")
+    
+    def get_model_info(self) -> Dict[str, str]:
+        """Get information about available models."""
+        return self.available_models
+    
+    def _get_model(self, generation_config: Optional[Dict[str, Any]] = None) -> genai.GenerativeModel:
+        """Get the cached client for this model and generation config."""
+        key = (self.model, json.dumps(generation_config, sort_keys=True) if generation_config else "")
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = genai.GenerativeModel(self.model, generation_config=generation_config)
+        return model
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the dedicated thread pool used for blocking Gemini calls."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="gemini")
+        return self._executor
+    
+    def close(self):
+        """Release the thread pool used for Gemini calls and close the cache."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self.translation_memory is not None:
+            self.translation_memory.flush()
+        self.cache.add_statistics(self.stats.take_unsaved())
+        self.cache.close()
+    
+    def set_cache_file(self, filename: str, language: str):
+        """Import the legacy per-file JSON cache of a presentation into the shared cache, if there is one."""
+        file_hash = hashlib.md5(filename.encode()).hexdigest()[:8]
+        legacy_file = f"translation_cache_{Path(filename).stem}_{language}_{file_hash}.json"
+        if os.path.exists(legacy_file):
+            try:
+                imported = self.cache.import_json(legacy_file, language, self.model)
+                if imported:
+                    logger.info(f"Imported {imported} entries from legacy cache {legacy_file}")
+            except Exception as e:
+                logger.warning(f"Failed to import legacy cache {legacy_file}: {e}")
+    
+    def _save_cache(self):
+        """Commit buffered translations and statistics to the shared cache."""
+        try:
+            self.cache.flush()
+            if self.translation_memory is not None:
+                self.translation_memory.flush()
+            self.cache.add_statistics(self.stats.take_unsaved())
+            memory = self.cache.memory.stats()
+            logger.info(f"Saved translation cache ({self.cache.path}); memory tier: {memory['entries']} entries, "
+                        f"{memory['bytes'] / 1024 / 1024:.1f}/{memory['max_bytes'] / 1024 / 1024:.0f} MB, "
+                        f"{memory['hits']} hits, {memory['misses']} misses, {memory['evictions']} evictions")
+        except Exception as e:
+            logger.error(f"Failed to save cache: {e}")
+    
+    def cache_report(self) -> Dict[str, Any]:
+        """
+        Cache statistics of this run and of every run that used the cache.
+        
+        Returns:
+            {'run': ..., 'cumulative': ..., 'memory_tier': ...}; bytes and tokens
+            saved count the source text and translation a hit did not send or receive
+        """
+        self.cache.add_statistics(self.stats.take_unsaved())
+        return {
+            'cache': self.cache.path,
+            'run': CacheStatistics.summarize(self.stats.counts),
+            'cumulative': CacheStatistics.summarize(self.cache.statistics()),
+            'memory_tier': self.cache.memory.stats()
+        }
+    
+    def _get_cache_key(self, text: str, target_language: str, context: str = "", human: bool = False) -> CacheKey:
+        """Generate cache key for text, target language, model, prompt version and context (or for a human translation)."""
+        if human:
+            return (source_hash(text, target_language), target_language, HUMAN_MODEL, "", "")
+        return (source_hash(text, target_language), target_language, self.model, PROMPT_VERSION, context_hash(context))
+    
+    def _cache_get(self, cache_key: CacheKey) -> Tuple[Optional[str], str]:
+        """
+        Look up a cached translation, then a human translation, then other models' if configured.
+        
+        Returns:
+            (translation or None, statistics counter of the hit)
+        """
+        translation = self.cache.get(cache_key)
+        if translation is not None:
+            return translation, 'hits'
+        translation = self.cache.get((cache_key[0], cache_key[1], HUMAN_MODEL, "", ""))
+        if translation is not None:
+            return translation, 'human_hits'
+        if self.cache_fallback_models is not None:
+            translation = self.cache.get_from_other_models(cache_key, self.cache_fallback_models or None)
+            if translation is not None:
+                logger.debug(f"Cache hit from another model for key {cache_key[0]}")
+                return translation, 'fallback_hits'
+        return None, 'misses'
+
+    
+    def _cache_lookup(self, text: str, target_language: str, context: str = "") -> Optional[str]:
+        """
+        Look up a text: exact key first, then its normalized form.
+        
+        The normalized form collapses whitespace and masks URLs, dates and numbers,
+        so "Revenue 2024" is served from the translation of "Revenue 2023".
+        Hits are counted in ``self.stats``; misses are counted by _memory_lookup.
+        """
+        translation, counter = self._cache_get(self._get_cache_key(text, target_language, context))
+        if translation is not None:
+            self.stats.record(counter, text, translation)
+            return translation
+        if not self.normalize_cache_keys:
+            return None
+        
+        masked, values = mask_text(text)
+        if masked == text:
+            return None
+        cached, _ = self._cache_get(self._get_cache_key(masked, target_language, context))
+        if cached is None:
+            return None
+        translation = unmask_translation(cached, values)
+        if translation is not None:
+            logger.debug(f"Normalized cache hit for: {text[:50]}...")
+            self.stats.record('normalized_hits', text, translation)
+        return translation
+    
+    def _cache_put(self, text: str, target_language: str, context: str, translation: str, human: bool = False,
+                   fragment: bool = False):
+        """
+        Cache a translation under the text's exact key and, when reusable, its normalized key.
+        
+        Pieces of a split paragraph (fragment) are only cached under their fragment_context()
+        key and stay out of the translation memory.
+        """
+        if fragment:
+            self.cache[self._get_cache_key(text, target_language, fragment_context(context))] = translation
+            return
+        self.cache[self._get_cache_key(text, target_language, context, human)] = translation
+        if self.translation_memory is not None:
+            self.translation_memory.add(text, target_language, translation)
+        if not self.normalize_cache_keys:
+            return
+        masked, values = mask_text(text)
+        if masked != text:
+            masked_translation = mask_translation(translation, values)
+            if masked_translation is not None:
+                self.cache[self._get_cache_key(masked, target_language, context, human)] = masked_translation
+    
+    def add_human_translations(self, pairs: List[Tuple[str, str]], target_language: str) -> int:
+        """
+        Pre-warm the cache with human translations, e.g. from aligned bilingual decks.
+        
+        They are served for any model, prompt and context (model's own translations
+        come first) and feed the translation memory.
+        
+        Args:
+            pairs: (source text, translated text) pairs
+            target_language: Language of the translated texts
+            
+        Returns:
+            Number of pairs added
+        """
+        added = 0
+        for text, translation in pairs:
+            if text.strip() and translation.strip() and text != translation:
+                self._cache_put(text, target_language, "", translation, human=True)
+                added += 1
+        return added
+    
+    def _memory_lookup(self, text: str, target_language: str, context: str = "") -> Tuple[Optional[str], Optional[MemoryMatch]]:
+        """
+        Look up a cache miss in the translation memory.
+        
+        A match is only reused without a request when its words are exactly those of the
+        text: a single changed word ("now" / "not") can flip the meaning however similar
+        the texts are. Reused translations are not cached under the text's own key, since
+        they were never made for it.
+        
+        Returns:
+            (translation, None) for a match differing only in whitespace, case or punctuation,
+            (None, match) for a similar text to pass to Gemini as a reference,
+            (None, None) otherwise
+        """
+        match = self.translation_memory.lookup(text, target_language) if self.translation_memory is not None else None
+        if match is not None and match[0] >= self.fuzzy_reuse_threshold and TranslationMemory.same_words(text, match[1]):
+            logger.debug(f"Translation memory hit ({match[0]:.1%}) for: {text[:50]}...")
+            self.stats.record('fuzzy_hits', text, match[2])
+            return match[2], None
+        self.stats.record('misses')
+        if match is not None:
+            self.stats.record('fuzzy_references')
+        return None, match
+    
+    async def _generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None, timeout: float = 30):
+        """
+        Send a single prompt to the Gemini API.
+        
+        Every call is throttled by the model's shared rate limiter and guarded
+        by the translator's circuit breaker.
+        
+        Args:
+            prompt: Prompt to send
+            generation_config: Optional generation config (e.g. response MIME type)
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Gemini response object
+        """
+        await self.circuit_breaker.before_call()
+        estimated_tokens = estimate_tokens(prompt)
+        await self.rate_limiter.acquire(estimated_tokens)
+        self.retry_budget.record_request()
+        
+        model = self._get_model(generation_config)
+        started = time.monotonic()
+        try:
+            if self.async_client:
+                call = model.generate_content_async(prompt)
+            else:
+                call = asyncio.get_running_loop().run_in_executor(self._get_executor(), model.generate_content, prompt)
+            response = await asyncio.wait_for(call, timeout=timeout)
+        except Exception as e:
+            # A quota error still proves the backend is reachable
+            kind = classify_error(e)
+            if kind == 'quota':
+                self.circuit_breaker.record_success()
+            elif kind in FATAL_ERRORS:
+                self.circuit_breaker.record_fatal(e)
+            else:
+                self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        self.concurrency_controller.on_success(time.monotonic() - started)
+        
+        # Correct the token bucket with the real prompt size when the API reports it
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        if isinstance(prompt_tokens, int):
+            self.rate_limiter.tokens.refund(estimated_tokens - prompt_tokens)
+        return response
+    
+    async def translate_text(self, text: str, target_language: str, context: str = "") -> str:
+        """
+        Translate text using Gemini API.
+        
+        Args:
+            text: Text to translate
+            target_language: Target language code (e.g., 'en', 'zh-CN', 'es')
+            context: Context information for better translation
+            
+        Returns:
+            Translated text (the original text if the translation failed)
+        """
+        if not text.strip():
+            return text
+        
+        cache_key = self._get_cache_key(text, target_language, context)
+        cached = self._cache_lookup(text, target_language, context)
+        if cached is not None:
+            logger.debug(f"Cache hit for: {text[:50]}...")
+            return cached
+        reused, reference = self._memory_lookup(text, target_language, context)
+        if reused is not None:
+            return reused
+        
+        try:
+            return await self._single_flight(cache_key, lambda: self._call_with_retries(
+                f"'{text[:50]}...'",
+                lambda: self._request_translation(text, target_language, context, reference)
+            ))
+        except Exception as e:
+            self._log_translation_error(e, text)
+            self.untranslated_count += 1
+            return text
+    
+    def _claim_in_flight(self, cache_key: CacheKey) -> Optional[asyncio.Future]:
+        """
+        Claim a cache key for translation.
+        
+        Returns:
+            None if the caller now owns the key (and must release it), otherwise
+            the future of the request already translating the same text
+        """
+        future = self._in_flight.get(cache_key)
+        if future is not None:
+            logger.debug(f"Coalescing duplicate request for {cache_key}")
+            return future
+        self._in_flight[cache_key] = asyncio.get_running_loop().create_future()
+        return None
+    
+    def _release_in_flight(self, cache_key: CacheKey, result: Optional[str] = None, error: Optional[BaseException] = None):
+        """Resolve a claimed key for every caller waiting on it."""
+        future = self._in_flight.pop(cache_key, None)
+        if future is None or future.done():
+            return
+        if result is not None:
+            future.set_result(result)
+        else:
+            future.set_exception(error or TranslationError("Translation not delivered"))
+            future.exception()  # Waiters handle the error; don't warn when there are none
+    
+    async def _single_flight(self, cache_key: CacheKey, request: Callable) -> str:
+        """
+        Run ``request()`` once for concurrent callers translating the same text.
+        
+        Args:
+            cache_key: Key from _get_cache_key identifying the text
+            request: Coroutine function returning the translation
+            
+        Returns:
+            The translation, shared by every caller with the same key
+        """
+        future = self._claim_in_flight(cache_key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        try:
+            result = await request()
+        except Exception as e:
+            self._release_in_flight(cache_key, error=e)
+            raise
+        except BaseException:
+            self._release_in_flight(cache_key, error=TranslationError("Translation cancelled"))
+            raise
+        self._release_in_flight(cache_key, result)
+        return result
+    
+    async def _call_with_retries(self, label: str, send: Callable, use_slot: bool = False):
+        """
+        Call ``send()``, retrying retryable errors with exponential backoff and jitter.
+        
+        Args:
+            label: Description of the request for log messages
+            send: Coroutine function performing the request
+            use_slot: Hold a concurrency controller slot during each attempt; retries
+                release it while backing off, so they go to the back of the queue
+            
+        Returns:
+            Result of ``send()``
+        """
+        controller = self.concurrency_controller
+        attempt = 0
+        while True:
+            attempt += 1
+            if use_slot:
+                await controller.acquire()
+            try:
+                return await send()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind in OVERLOAD_ERRORS:
+                    controller.on_overload()
+                if kind not in RETRYABLE_ERRORS or attempt > self.max_retries or not self.retry_budget.withdraw():
+                    raise
+                delay = retry_delay(attempt, e)
+                logger.warning(f"{kind.capitalize()} error for {label}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+            finally:
+                if use_slot:
+                    await controller.release()
+            await asyncio.sleep(delay)
+    
+    async def _request_translation(self, text: str, target_language: str, context: str = "", reference: Optional[MemoryMatch] = None,
+                                   fragment: bool = False) -> str:
+        """
+        Translate one text with a single Gemini request and cache the result.
+        
+        Args:
+            text: Text to translate
+            target_language: Target language code
+            context: Context information
+            reference: Translation memory match to show Gemini as an example
+            fragment: The text is a piece of a split paragraph (see _cache_put)
+        
+        Raises:
+            TranslationError: If the response is empty
+            asyncio.TimeoutError: If the request timed out
+            Exception: Any error raised by the Gemini client
+        """
+        # Prepare prompt for translation
+        prompt_context = context
+        if reference is not None:
+            prompt_context = REFERENCE_NOTE.format(context=context, source=reference[1], translation=reference[2])
+        prompt = TRANSLATION_PROMPT.format(target_language=target_language, context=prompt_context, text=text)
+        
+        # Use Gemini API with timeout
+        response = await self._generate(prompt)
+        if not (response and response.text):
+            raise TranslationError("Empty response from Gemini API")
         
-        if model not in self.available_models:
-            logger.warning(f"Model {model} not in known models. Available: {list(self.available_models.keys())}")
-    
-    def get_model_info(self) -> Dict[str, str]:
-        """Get information about available models."""
-        return self.available_models
+        translated_text = response.text.strip()
+        self._cache_put(text, target_language, context, translated_text, fragment=fragment)
+        logger.debug(f"Translated: {text[:50]}... -> {translated_text[:50]}...")
+        return translated_text
     
-    def set_cache_file(self, filename: str, language: str):
-        """Set cache file for this translation session."""
-        file_hash = hashlib.md5(filename.encode()).hexdigest()[:8]
-        self.cache_file = f"translation_cache_{Path(filename).stem}_{language}_{file_hash}.json"
-        self._load_cache()
+    def _log_translation_error(self, error: BaseException, text: str):
+        """Log a failed translation of a text."""
+        kind = classify_error(error)
+        if isinstance(error, TranslationError):
+            logger.warning(f"{error} for: {text[:50]}...")
+        elif kind == 'circuit_open':
+            logger.debug(f"{error}; keeping original text for '{text[:50]}...'")
+        elif kind == 'timeout':
+            logger.error(f"Translation timeout for '{text[:50]}...'")
+        elif kind == 'quota':
+            logger.error(f"API quota exceeded for '{text[:50]}...'")
+        elif kind == 'auth':
+            logger.error(f"Invalid API key for '{text[:50]}...'")
+        else:
+            logger.error(f"Translation error for '{text[:50]}...': {error}")
     
-    def _load_cache(self):
-        """Load existing translation cache."""
-        if self.cache_file and os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
-                logger.info(f"Loaded cache with {len(self.cache)} entries from {self.cache_file}")
-            except Exception as e:
-                logger.warning(f"Failed to load cache: {e}")
-                self.cache = {}
+    def get_packer(self, batch_size: Optional[int] = None, max_input_tokens: Optional[int] = None,
+                   max_output_tokens: Optional[int] = None) -> 'SegmentPacker':
+        """Create a segment packer for this translator's token budgets (or the given ones)."""
+        return SegmentPacker(
+            max_input_tokens=max_input_tokens or self.max_input_tokens,
+            max_output_tokens=max_output_tokens or self.max_output_tokens,
+            max_segments=batch_size or self.batch_size
+        )
     
-    def _save_cache(self):
-        """Save translation cache to file."""
-        if self.cache_file:
-            try:
-                with open(self.cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.cache, f, ensure_ascii=False, indent=2)
-                logger.info(f"Saved cache with {len(self.cache)} entries to {self.cache_file}")
-            except Exception as e:
-                logger.error(f"Failed to save cache: {e}")
+    def _build_packed_prompt(self, segments: Dict[str, str], target_language: str, context: str = "",
+                             references: Optional[Dict[str, MemoryMatch]] = None) -> str:
+        """Build a prompt that asks for several segments to be translated at once."""
+        items = []
+        for seg_id, text in segments.items():
+            item = {"id": seg_id, "text": text}
+            reference = references.get(seg_id) if references else None
+            if reference is not None:
+                item["reference"] = {"source": reference[1], "translation": reference[2]}
+            items.append(item)
+        if any("reference" in item for item in items):
+            context = PACKED_REFERENCE_NOTE.format(context=context)
+        payload = json.dumps(items, ensure_ascii=False)
+        return PACKED_TRANSLATION_PROMPT.format(target_language=target_language, context=context, payload=payload)
     
-    def _get_cache_key(self, text: str, target_language: str) -> str:
-        """Generate cache key for text and target language."""
-        return hashlib.md5(f"{text}_{target_language}".encode()).hexdigest()
+    def _parse_packed_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse the JSON returned for a packed request into an id -> translation mapping."""
+        cleaned = response_text.strip()
+        if cleaned.startswith("```"):
+            # Strip a Markdown code fence if the model added one
+            cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else ""
+            cleaned = cleaned.rsplit("```", 1)[0]
+        
+        try:
+            data = json.loads(cleaned)
+        except ValueError:
+            return {}
+        
+        if isinstance(data, dict):
+            return {str(seg_id): value for seg_id, value in data.items()}
+        if isinstance(data, list):
+            # Tolerate the input shape echoed back: [{"id": ..., "text": ...}, ...]
+            return {
+                str(item.get("id")): item.get("text")
+                for item in data if isinstance(item, dict) and "id" in item
+            }
+        return {}
     
-    async def translate_text(self, text: str, target_language: str, context: str = "") -> str:
+    async def translate_packed(self, segments: Dict[str, str], target_language: str, context: str = "",
+                               references: Optional[Dict[str, MemoryMatch]] = None, fragments: Container[str] = ()) -> Dict[str, str]:
         """
-        Translate text using Gemini API.
+        Translate several segments in a single Gemini request.
+        
+        Segments whose ID is missing or malformed in the response are re-sent
+        (and only those) up to ``max_pack_attempts`` times. Request errors are
+        raised; segments translated before the error are already in the cache.
         
         Args:
-            text: Text to translate
-            target_language: Target language code (e.g., 'en', 'zh-CN', 'es')
-            context: Context information for better translation
+            segments: Mapping of stable segment ID to text
+            target_language: Target language code
+            context: Context information
+            references: Translation memory matches by segment ID, shown to Gemini as examples
+            fragments: IDs of segments that are pieces of a split paragraph (see _cache_put)
             
         Returns:
-            Translated text
+            Mapping of segment ID to translated text for every segment that came back
         """
-        if not text.strip():
-            return text
+        pending = dict(segments)
+        translated = {}
         
-        cache_key = self._get_cache_key(text, target_language)
-        if cache_key in self.cache:
-            logger.debug(f"Cache hit for: {text[:50]}...")
-            return self.cache[cache_key]
-        
-        try:
-            # Prepare prompt for translation
-            prompt = f"""
-            You are a professional translator. Translate the following text to {target_language}.
-            
-            Context: {context}
-            
-            Text to translate: "{text}"
+        for attempt in range(1, self.max_pack_attempts + 1):
+            if not pending:
+                break
             
-            Instructions:
-            1. Maintain the original meaning and tone
-            2. Preserve any formatting markers or special characters
-            3. Keep the translation natural and fluent
-            4. If the text contains placeholders or variables, keep them unchanged
-            5. Return only the translated text, nothing else
-            
-            Translated text:
-            """
+            prompt = self._build_packed_prompt(pending, target_language, context, references)
+            response = await self._generate(prompt, generation_config={"response_mime_type": "application/json"})
+            parsed = self._parse_packed_response(response.text if response else "")
             
-            # Use Gemini API with timeout
-            model = genai.GenerativeModel(self.model)
+            for seg_id in list(pending):
+                value = parsed.get(seg_id)
+                if isinstance(value, str) and value.strip():
+                    text = pending.pop(seg_id)
+                    translated[seg_id] = value.strip()
+                    self._cache_put(text, target_language, context, translated[seg_id], fragment=seg_id in fragments)
             
-            try:
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(model.generate_content, prompt),
-                    timeout=30  # 30 second timeout
-                )
-                
-                if response and response.text:
-                    translated_text = response.text.strip()
-                    self.cache[cache_key] = translated_text
-                    logger.debug(f"Translated: {text[:50]}... -> {translated_text[:50]}...")
-                    return translated_text
-                else:
-                    logger.warning(f"Empty response from Gemini API for: {text[:50]}...")
-                    return text
-                    
-            except asyncio.TimeoutError:
-                logger.error(f"Translation timeout for '{text[:50]}...'")
-                return text
-                
-        except Exception as e:
-            error_msg = str(e)
-            if "quota" in error_msg.lower():
-                logger.error(f"API quota exceeded for '{text[:50]}...'")
-            elif "key" in error_msg.lower():
-                logger.error(f"Invalid API key for '{text[:50]}...'")
-            else:
-                logger.error(f"Translation error for '{text[:50]}...': {e}")
-            return text
+            if pending:
+                logger.warning(f"Packed response missing {len(pending)}/{len(segments)} segments (attempt {attempt}/{self.max_pack_attempts})")
+        
+        return translated
     
-    async def translate_batch(self, texts: List[str], target_language: str, context: str = "", verbose: bool = False) -> List[str]:
+    async def translate_batch(self, texts: List[str], target_language: str, context: str = "", verbose: bool = False, concurrency: Optional[int] = None, batch_size: Optional[int] = None,
+                              show_progress: bool = True, max_input_tokens: Optional[int] = None, max_output_tokens: Optional[int] = None) -> List[str]:
         """
         Translate a batch of texts.
         
@@ -223,6 +2333,11 @@ class GeminiTranslator:
             texts: List of texts to translate
             target_language: Target language code
             context: Context information
+            concurrency: Restart the adaptive controller at this many in-flight requests (default: keep current)
+            batch_size: Number of segments packed into one request (default: translator setting)
+            show_progress: Show a progress bar (unless verbose)
+            max_input_tokens: Input token budget of a packed request (default: translator setting)
+            max_output_tokens: Output token budget of a packed request (default: translator setting)
             
         Returns:
             List of translated texts
@@ -238,46 +2353,285 @@ class GeminiTranslator:
             return results
         
         total_texts = len(non_empty_texts)
-        logger.info(f"Starting translation of {total_texts} texts to {target_language}")
+        # The adaptive controller bounds the requests in flight and keeps what it learned across batches
+        controller = self.concurrency_controller
+        if concurrency:
+            controller.reset(concurrency, max(concurrency, self.max_concurrency))
+        batch_size = max(1, batch_size or self.batch_size)
+        logger.info(f"Starting translation of {total_texts} texts to {target_language} (concurrency: {controller.current_limit}, batch size: {batch_size})")
         
         # Initialize progress tracker (only if not verbose)
-        progress = None if verbose else ProgressTracker(total_texts, f"Translating to {target_language}")
+        progress = None if verbose or not show_progress else ProgressTracker(total_texts, f"Translating to {target_language}")
+        completed = 0
         
-        # Translate non-empty texts with progress
+        def mark_done(count: int, text: str = ""):
+            nonlocal completed
+            completed += count
+            if progress:
+                # Update progress bar
+                progress.update(completed, text)
+        
+        # Cached segments never need to be sent, so keep them out of the requests.
+        # Similar texts found in the translation memory go along as references.
+        pending = []
+        references: Dict[str, MemoryMatch] = {}
         for idx, (i, text) in enumerate(non_empty_texts, 1):
+            cached = self._cache_lookup(text, target_language, context)
+            if cached is None:
+                cached, reference = self._memory_lookup(text, target_language, context)
+                if reference is not None:
+                    references[str(i)] = reference
+            if cached is not None:
+                results[i] = cached
+                mark_done(1, text)
+            else:
+                pending.append((idx, i, text))
+        
+        # Segment IDs are the positions in the input list, so they stay stable across re-sends.
+        # In packed mode long paragraphs are split at sentence boundaries into "<i>.<k>" pieces
+        # that are re-joined once every piece is back; pieces are cached apart from whole texts.
+        packer = self.get_packer(batch_size, max_input_tokens, max_output_tokens)
+        segments = []
+        pieces: Dict[int, List[Optional[str]]] = {}
+        separators: Dict[int, List[str]] = {}
+        fragments: Set[str] = set()
+        for idx, i, text in pending:
+            chunks = packer.split(text) if batch_size > 1 else [(text, "")]
+            if len(chunks) == 1:
+                segments.append((str(i), idx, i, text))
+                continue
+            pieces[i] = [None] * len(chunks)
+            separators[i] = [separator for _, separator in chunks]
+            for k, (chunk, _) in enumerate(chunks):
+                segments.append((f"{i}.{k}", idx, i, chunk))
+                fragments.add(f"{i}.{k}")
+        
+        def segment_key(seg_id: str, text: str) -> CacheKey:
+            return self._get_cache_key(text, target_language, fragment_context(context) if seg_id in fragments else context)
+        
+        # Results are written back by index so order is kept
+        failed = set()
+        
+        def store(seg_id: str, i: int, translation: str):
+            if i not in pieces:
+                results[i] = translation
+                mark_done(1, texts[i])
+                return
+            part = pieces[i]
+            part[int(seg_id.rsplit('.', 1)[1])] = translation
+            if all(piece is not None for piece in part):
+                results[i] = packer.join(part, separators[i])
+                # A piece that fell back to its source text would leave the paragraph partly untranslated for good
+                if i not in failed:
+                    self._cache_put(texts[i], target_language, context, results[i])
+                mark_done(1, texts[i])
+        
+        async def run_request(label: str, send: Callable):
+            return await self._call_with_retries(label, send, use_slot=True)
+        
+        async def translate_one(seg_id: str, idx: int, i: int, text: str):
+            cache_key = segment_key(seg_id, text)
+            
+            async def send():
+                # An identical text may have been translated while this one was waiting
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                return await self._request_translation(text, target_language, context, references.get(seg_id),
+                                                       fragment=seg_id in fragments)
+            
             try:
                 if verbose:
                     logger.info(f"Translating {idx}/{total_texts}: {text[:50]}{'...' if len(text) > 50 else ''}")
-                else:
-                    # Update progress bar
-                    progress.update(idx, text)
                 
-                # Translate text
-                results[i] = await self.translate_text(text, target_language, context)
-                
-                # Small delay to avoid rate limiting
-                await asyncio.sleep(0.1)
+                # Translate text (identical texts in flight share one request)
+                translation = await self._single_flight(cache_key, lambda: run_request(f"text {idx}", send))
                 
             except Exception as e:
-                logger.error(f"Failed to translate text {idx}: {e}")
-                results[i] = text  # Keep original text on error
+                self._log_translation_error(e, text)
+                translation = text  # Keep original text on error
+                failed.add(i)
+            
+            store(seg_id, i, translation)
+        
+        async def translate_pack(pack: List[tuple]):
+            label = f"texts {pack[0][1]}-{pack[-1][1]}"
+            owned = set()  # cache keys this pack is translating for every concurrent caller
+            followers = {}  # seg_id -> future of an identical segment in flight in another request
+            
+            async def send():
+                # Segments delivered by an earlier attempt come from the cache, and segments
+                # already in flight elsewhere are awaited instead of being sent twice
+                remaining = {}
+                sent = set()
+                for seg_id, _, _, text in pack:
+                    cache_key = segment_key(seg_id, text)
+                    if seg_id in followers or cache_key in sent or cache_key in self.cache:
+                        continue
+                    if cache_key not in owned:
+                        future = self._claim_in_flight(cache_key)
+                        if future is not None:
+                            followers[seg_id] = future
+                            continue
+                        owned.add(cache_key)
+                    remaining[seg_id] = text
+                    sent.add(cache_key)
+                if remaining:
+                    await self.translate_packed(remaining, target_language, context, references, fragments)
+            
+            if verbose:
+                logger.info(f"Translating {pack[0][1]}-{pack[-1][1]}/{total_texts} in one request ({len(pack)} segments)")
+            try:
+                await run_request(label, send)
+            except Exception as e:
+                logger.error(f"Failed to translate {label}: {e}")
+            finally:
+                for cache_key in owned:
+                    self._release_in_flight(cache_key, self.cache.get(cache_key))
+            
+            for future in followers.values():
+                try:
+                    await asyncio.shield(future)
+                except Exception:
+                    pass  # The segment falls back below
+            
+            # Every delivered translation (from this request or a coalesced one) is in the cache
+            missing = []
+            for segment in pack:
+                seg_id, _, i, text = segment
+                translation = self.cache.get(segment_key(seg_id, text))
+                if translation is not None:
+                    store(seg_id, i, translation)
+                else:
+                    missing.append(segment)
+            
+            # Whatever the packed request could not deliver falls back to one request per segment
+            await asyncio.gather(*(translate_one(*segment) for segment in missing))
+        
+        # Translate non-empty texts with progress
+        if batch_size > 1:
+            packs = packer.pack(segments, text_of=lambda segment: segment[3])
+            logger.info(f"Packed {len(segments)} segments into {len(packs)} requests")
+            await asyncio.gather(*(translate_pack(pack) for pack in packs))
+        else:
+            await asyncio.gather(*(translate_one(*segment) for segment in segments))
         
         # Finish progress display
         if progress:
             progress.finish()
-        logger.info(f"Translation completed: {total_texts} texts processed")
+        logger.info(f"Translation completed: {total_texts} texts processed (final concurrency: {controller.current_limit})")
+        if failed:
+            self.untranslated_count += len(failed)
+            logger.warning(f"{len(failed)} of {total_texts} texts were left untranslated")
         return results
 
+# Namespaces for reading slide XML parts directly
+XML_NAMESPACES = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'c': 'http://schemas.openxmlformats.org/drawingml/2006/chart',
+    'dgm': 'http://schemas.openxmlformats.org/drawingml/2006/diagram',
+    'dsp': 'http://schemas.microsoft.com/office/drawing/2008/diagram',
+}
+_A = f"{{{XML_NAMESPACES['a']}}}"
+_P = f"{{{XML_NAMESPACES['p']}}}"
+_R = f"{{{XML_NAMESPACES['r']}}}"
+# Children of p:spTree that python-pptx counts as shapes
+_SHAPE_TAGS = {f"{_P}sp", f"{_P}grpSp", f"{_P}graphicFrame", f"{_P}cxnSp", f"{_P}pic", f"{_P}contentPart"}
+_TABLE_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+# Tag names used in hot loops (iterchildren with a tag is much faster than find/iterfind)
+_A_P, _A_BR, _A_T = (f"{_A}{tag}" for tag in ('p', 'br', 't'))
+# Parts holding chart and SmartArt text, by relationship type suffix. PowerPoint draws SmartArt
+# from the cached drawing part, so it is translated along with the diagram data.
+_GRAPHIC_PART_TYPES = {'/chart': 'chart', '/diagramData': 'diagram', '/diagramDrawing': 'diagram'}
+# Chart titles, axis titles and data labels are rich text; series names and category labels are
+# the string caches of the embedded workbook, which is left untouched
+_GRAPHIC_TEXT = etree.XPath(
+    "//c:rich/a:p | //c:strCache/c:pt/c:v | //c:strLit/c:pt/c:v | //dgm:t/a:p | //dsp:txBody/a:p",
+    namespaces=XML_NAMESPACES
+)
+
+def xml_paragraph_text(p) -> str:
+    """Text of an a:p element, as python-pptx's paragraph.text returns it (line breaks are vertical tabs)."""
+    # a:t only occurs in the paragraph's runs and fields, so one pass in document order is enough
+    return "".join(["\v" if node.tag == _A_BR else (node.text or "") for node in p.iter(_A_T, _A_BR)])
+
+def _part_rels_name(part_name: str) -> str:
+    return posixpath.join(posixpath.dirname(part_name), '_rels', posixpath.basename(part_name) + '.rels')
+
+def _resolve_target(part_name: str, target: str) -> str:
+    """Package part name a relationship target of ``part_name`` points at."""
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part_name), target))
+
+def part_relationships(package: zipfile.ZipFile, part_name: str) -> List[Tuple[str, str]]:
+    """(relationship type, target part name) of each internal relationship of a package part."""
+    try:
+        rels = etree.fromstring(package.read(_part_rels_name(part_name)))
+    except KeyError:
+        return []
+    return [(rel.get('Type', ''), _resolve_target(part_name, rel.get('Target')))
+            for rel in rels if rel.get('TargetMode') != 'External']
+
+def notes_part_name(package: zipfile.ZipFile, slide_part: str) -> Optional[str]:
+    """Name of a slide's notes slide part, or None if the slide has no notes."""
+    return next((target for rel_type, target in part_relationships(package, slide_part) if rel_type.endswith('/notesSlide')), None)
+
+def graphic_part_kind(rel_type: str) -> Optional[str]:
+    """'chart' or 'diagram' for relationships to parts with chart or SmartArt text, else None."""
+    return next((kind for suffix, kind in _GRAPHIC_PART_TYPES.items() if rel_type.endswith(suffix)), None)
+
+def slide_part_names(package: zipfile.ZipFile) -> List[str]:
+    """Names of a presentation's slide parts, in slide order."""
+    root_rels = etree.fromstring(package.read('_rels/.rels'))
+    main_part = next(_resolve_target('', rel.get('Target')) for rel in root_rels if rel.get('Type', '').endswith('/officeDocument'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in etree.fromstring(package.read(_part_rels_name(main_part)))}
+    presentation = etree.fromstring(package.read(main_part))
+    return [_resolve_target(main_part, targets[slide_id.get(f"{_R}id")])
+            for slide_id in presentation.iterfind('p:sldIdLst/p:sldId', XML_NAMESPACES)]
+
 class PPTXProcessor:
     """Process PowerPoint presentations for translation."""
     
-    def __init__(self, translator: GeminiTranslator):
+    def __init__(self, translator: GeminiTranslator, extractor: str = 'pptx', window_size: int = 200, max_windows: int = 4,
+                 include_notes: bool = False, notes_budget: float = 4.0, include_graphics: bool = True):
+        """
+        Initialize the processor.
+        
+        Args:
+            translator: Translator used for the text
+            extractor: 'pptx' walks the python-pptx object model; 'xml' parses the
+                slide XML parts directly, which is much faster on large decks
+            window_size: Text elements extracted before they are sent for translation
+                (0 translates the whole deck in one batch)
+            max_windows: Windows extracted but not yet written back, which bounds memory use
+            include_notes: Also translate the slides' speaker notes
+            notes_budget: Token budgets and batch size of speaker-notes requests, as a multiple
+                of the translator's settings for slide text
+            include_graphics: Also translate chart and SmartArt text
+        """
         self.translator = translator
+        self.extractor = extractor
+        self.window_size = window_size
+        self.max_windows = max(1, max_windows)
+        self.include_notes = include_notes
+        self.notes_budget = max(1.0, notes_budget)
+        self.include_graphics = include_graphics
+        # Chart and diagram parts parsed for write-back, for the presentation being translated
+        self._parts_presentation = None
+        self._parts: Dict[str, Any] = {}
+        self._part_elements: Dict[str, Any] = {}
     
     def extract_text_from_slide(self, slide: Slide) -> List[Dict[str, Any]]:
         """
         Extract text from a slide with improved text merging.
         
+        Group shapes are walked depth-first with an explicit stack of shape iterators,
+        so deeply nested diagrams cost no recursion and no copies of shape lists.
+        ``shape_path`` holds the shape's index at each nesting level.
+        
         Args:
             slide: PowerPoint slide object
             
@@ -286,7 +2640,15 @@ class PPTXProcessor:
         """
         text_elements = []
         
-        for shape in slide.shapes:
+        stack = [((), enumerate(slide.shapes))]
+        while stack:
+            parent_path, shapes = stack[-1]
+            shape_idx, shape = next(shapes, (None, None))
+            if shape is None:
+                stack.pop()
+                continue
+            shape_path = parent_path + (shape_idx,)
+            
             if shape.has_text_frame:
                 # 按段落提取完整文本，而不是按run分割
                 for paragraph_idx, paragraph in enumerate(shape.text_frame.paragraphs):
@@ -295,11 +2657,16 @@ class PPTXProcessor:
                         text_elements.append({
                             'text': paragraph_text,
                             'shape': shape,
+                            'shape_idx': shape_idx,
+                            'shape_path': shape_path,
                             'paragraph': paragraph,
                             'paragraph_idx': paragraph_idx,
                             'type': 'text'
                         })
             
+            elif shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                stack.append((shape_path, enumerate(shape.shapes)))
+            
             elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
                 table = shape.table
                 for row_idx, row in enumerate(table.rows):
@@ -310,6 +2677,8 @@ class PPTXProcessor:
                             text_elements.append({
                                 'text': cell_text,
                                 'shape': shape,
+                                'shape_idx': shape_idx,
+                                'shape_path': shape_path,
                                 'table': table,
                                 'cell': cell,
                                 'row_idx': row_idx,
@@ -329,15 +2698,321 @@ class PPTXProcessor:
         Returns:
             List of all text elements with metadata
         """
-        all_text_elements = []
+        return [element for slide_elements in self.iter_slide_text(presentation) for element in slide_elements]
+    
+    def iter_slide_text(self, presentation: Presentation) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Extract text one slide at a time.
         
+        Yields:
+            Text elements of each slide, in slide order
+        """
+        seen_parts = set()
         for slide_num, slide in enumerate(presentation.slides):
             slide_elements = self.extract_text_from_slide(slide)
+            if self.include_graphics:
+                # A chart or diagram part shared by several slides is extracted once
+                graphic_parts = []
+                for rel in slide.part.rels.values():
+                    kind = None if rel.is_external else graphic_part_kind(rel.reltype)
+                    if kind:
+                        graphic_parts.append((str(rel.target_part.partname)[1:], kind, rel.target_part))
+                for part_name, kind, part in sorted(graphic_parts, key=lambda graphic_part: graphic_part[0]):
+                    if part_name not in seen_parts:
+                        seen_parts.add(part_name)
+                        slide_elements.extend(self.extract_text_from_part(part_name, part.blob, kind))
+            if self.include_notes:
+                slide_elements.extend(self.extract_notes_from_slide(slide))
             for element in slide_elements:
                 element['slide_number'] = slide_num + 1
-                all_text_elements.append(element)
+            yield slide_elements
+    
+    def extract_notes_from_slide(self, slide: Slide) -> List[Dict[str, Any]]:
+        """
+        Extract the speaker notes of a slide, one element per paragraph.
+        
+        Args:
+            slide: PowerPoint slide object
+            
+        Returns:
+            List of 'notes' text elements (empty if the slide has no notes)
+        """
+        # notes_slide creates a notes slide when there is none, so check first
+        if not slide.has_notes_slide:
+            return []
+        text_frame = slide.notes_slide.notes_text_frame
+        if text_frame is None:
+            return []
+        
+        notes_elements = []
+        for paragraph_idx, paragraph in enumerate(text_frame.paragraphs):
+            paragraph_text = paragraph.text.strip()
+            if paragraph_text:
+                notes_elements.append({
+                    'text': paragraph_text,
+                    'shape_path': (),
+                    'paragraph': paragraph,
+                    'paragraph_idx': paragraph_idx,
+                    'type': 'notes'
+                })
+        return notes_elements
+    
+    def extract_text_from_slide_xml(self, slide_xml: bytes) -> List[Dict[str, Any]]:
+        """
+        Extract text from a slide XML part without building python-pptx objects.
+        
+        Produces the same elements as extract_text_from_slide, except that each one
+        carries a ``locator`` (an XPath relative to the slide element) instead of
+        the python-pptx shape, paragraph or cell.
+        
+        Args:
+            slide_xml: Content of a ppt/slides/slideN.xml part
+            
+        Returns:
+            List of text elements with metadata
+        """
+        text_elements = []
+        sp_tree = etree.fromstring(slide_xml).find('p:cSld/p:spTree', XML_NAMESPACES)
+        if sp_tree is None:
+            return text_elements
+        
+        # Same depth-first walk as extract_text_from_slide; each frame is
+        # [locator, shape path, children iterator, shapes seen so far]
+        stack = [["./p:cSld/p:spTree", (), enumerate(sp_tree, 1), 0]]
+        while stack:
+            frame = stack[-1]
+            parent_locator, parent_path, children, _ = frame
+            position, shape = next(children, (None, None))
+            if shape is None:
+                stack.pop()
+                continue
+            if shape.tag not in _SHAPE_TAGS:
+                continue
+            shape_idx = frame[3]
+            frame[3] += 1
+            shape_path = parent_path + (shape_idx,)
+            shape_locator = f"{parent_locator}/*[{position}]"
+            
+            if shape.tag == f"{_P}grpSp":
+                stack.append([shape_locator, shape_path, enumerate(shape, 1), 0])
+            
+            elif shape.tag == f"{_P}sp":
+                tx_body = next(shape.iterchildren(f"{_P}txBody"), None)
+                if tx_body is None:
+                    continue
+                for paragraph_idx, paragraph in enumerate(tx_body.iterchildren(_A_P)):
+                    paragraph_text = xml_paragraph_text(paragraph).strip()
+                    if paragraph_text:
+                        text_elements.append({
+                            'text': paragraph_text,
+                            'shape_idx': shape_idx,
+                            'shape_path': shape_path,
+                            'paragraph_idx': paragraph_idx,
+                            'locator': f"{shape_locator}/p:txBody/a:p[{paragraph_idx + 1}]",
+                            'type': 'text'
+                        })
+            
+            elif shape.tag == f"{_P}graphicFrame":
+                graphic_data = shape.find('a:graphic/a:graphicData', XML_NAMESPACES)
+                if graphic_data is None or graphic_data.get('uri') != _TABLE_URI:
+                    continue
+                for row_idx, row in enumerate(graphic_data.iterfind('a:tbl/a:tr', XML_NAMESPACES)):
+                    for col_idx, cell in enumerate(row.iterchildren(f"{_A}tc")):
+                        tx_body = next(cell.iterchildren(f"{_A}txBody"), None)
+                        if tx_body is None:
+                            continue
+                        cell_text = "\n".join(xml_paragraph_text(paragraph) for paragraph in tx_body.iterchildren(_A_P)).strip()
+                        if cell_text:
+                            text_elements.append({
+                                'text': cell_text,
+                                'shape_idx': shape_idx,
+                                'shape_path': shape_path,
+                                'row_idx': row_idx,
+                                'col_idx': col_idx,
+                                'locator': f"{shape_locator}/a:graphic/a:graphicData/a:tbl/a:tr[{row_idx + 1}]/a:tc[{col_idx + 1}]",
+                                'type': 'table'
+                            })
+        
+        return text_elements
+    
+    def extract_notes_from_slide_xml(self, notes_xml: bytes) -> List[Dict[str, Any]]:
+        """
+        Extract speaker notes from a notes slide XML part, like extract_notes_from_slide.
+        
+        Locators are relative to the notes slide element.
+        
+        Args:
+            notes_xml: Content of a ppt/notesSlides/notesSlideN.xml part
+            
+        Returns:
+            List of 'notes' text elements
+        """
+        sp_tree = etree.fromstring(notes_xml).find('p:cSld/p:spTree', XML_NAMESPACES)
+        if sp_tree is None:
+            return []
+        
+        # The notes text is the first body placeholder, as for python-pptx's notes_placeholder
+        for position, shape in enumerate(sp_tree, 1):
+            if shape.tag == f"{_P}sp" and shape.find("p:nvSpPr/p:nvPr/p:ph[@type='body']", XML_NAMESPACES) is not None:
+                break
+        else:
+            return []
+        tx_body = next(shape.iterchildren(f"{_P}txBody"), None)
+        if tx_body is None:
+            return []
+        
+        notes_elements = []
+        for paragraph_idx, p in enumerate(tx_body.iterchildren(_A_P)):
+            paragraph_text = xml_paragraph_text(p).strip()
+            if paragraph_text:
+                notes_elements.append({
+                    'text': paragraph_text,
+                    'shape_path': (),
+                    'paragraph_idx': paragraph_idx,
+                    'locator': f"./p:cSld/p:spTree/*[{position}]/p:txBody/a:p[{paragraph_idx + 1}]",
+                    'type': 'notes'
+                })
+        return notes_elements
+    
+    def extract_text_from_part(self, part_name: str, part_xml: bytes, kind: str) -> List[Dict[str, Any]]:
+        """
+        Extract chart or SmartArt text from a chart, diagram data or diagram drawing part.
+        
+        Parts are read as XML straight from the package, so embedded chart workbooks are
+        never loaded. Each element carries the ``part`` name and a ``locator`` (an
+        ElementPath relative to the part's root) to the a:p paragraph or c:v value.
+        
+        Args:
+            part_name: Package part name (e.g. ppt/charts/chart1.xml)
+            part_xml: Content of the part
+            kind: 'chart' or 'diagram'
+            
+        Returns:
+            List of text elements with metadata
+        """
+        tree = etree.fromstring(part_xml).getroottree()
+        part_elements = []
+        for node in _GRAPHIC_TEXT(tree):
+            text = (xml_paragraph_text(node) if node.tag == _A_P else node.text or "").strip()
+            if text:
+                part_elements.append({
+                    'text': text,
+                    'part': part_name,
+                    'locator': tree.getelementpath(node),
+                    'type': kind
+                })
+        return part_elements
+    
+    def extract_all_text_xml(self, input_file: str) -> List[Dict[str, Any]]:
+        """
+        Extract all text by parsing the slide parts of a .pptx file directly.
+        
+        Args:
+            input_file: Path to the PowerPoint file
+            
+        Returns:
+            List of all text elements with metadata (see extract_text_from_slide_xml)
+        """
+        return [element for slide_elements in self.iter_slide_text_xml(input_file) for element in slide_elements]
+    
+    def iter_slide_text_xml(self, input_file: str) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Extract text one slide part at a time.
+        
+        Yields:
+            Text elements of each slide, in slide order
+        """
+        seen_parts = set()
+        with zipfile.ZipFile(input_file) as package:
+            for slide_num, part_name in enumerate(slide_part_names(package)):
+                slide_elements = self.extract_text_from_slide_xml(package.read(part_name))
+                if self.include_graphics:
+                    graphic_parts = sorted((target, graphic_part_kind(rel_type)) for rel_type, target in part_relationships(package, part_name)
+                                           if graphic_part_kind(rel_type))
+                    for graphic_part, kind in graphic_parts:
+                        if graphic_part not in seen_parts:
+                            seen_parts.add(graphic_part)
+                            slide_elements.extend(self.extract_text_from_part(graphic_part, package.read(graphic_part), kind))
+                if self.include_notes:
+                    notes_part = notes_part_name(package, part_name)
+                    if notes_part is not None:
+                        slide_elements.extend(self.extract_notes_from_slide_xml(package.read(notes_part)))
+                for element in slide_elements:
+                    element['slide_number'] = slide_num + 1
+                yield slide_elements
+    
+    def bind_element(self, presentation: Presentation, element: Dict[str, Any]):
+        """Attach the python-pptx paragraph or cell (or chart c:v value) an element's locator points at."""
+        if 'part' in element:
+            node = self.part_element(presentation, element['part']).find(element['locator'])
+            if node.tag == _A_P:
+                element['paragraph'] = _Paragraph(node, None)
+            else:
+                element['value'] = node
+            return
+        slide = presentation.slides[element['slide_number'] - 1]
+        root = slide.notes_slide._element if element['type'] == 'notes' else slide._element
+        node = root.xpath(element['locator'])[0]
+        if element['type'] == 'table':
+            element['cell'] = _Cell(node, None)
+        else:
+            element['paragraph'] = _Paragraph(node, None)
+    
+    def part_element(self, presentation: Presentation, part_name: str):
+        """Root element of a chart or diagram part, parsed once per presentation for write-back."""
+        if self._parts_presentation is not presentation:
+            self._parts_presentation = presentation
+            self._parts = {str(part.partname)[1:]: part for part in presentation.part.package.iter_parts()}
+            self._part_elements = {}
+        root = self._part_elements.get(part_name)
+        if root is None:
+            # python-pptx keeps chart parts as XML, but diagram parts only as bytes
+            part = self._parts[part_name]
+            root = part._element if isinstance(part, XmlPart) else parse_xml(part.blob)
+            self._part_elements[part_name] = root
+        return root
+    
+    def save_parts(self, presentation: Presentation):
+        """Store translated diagram parts back into the presentation before it is saved."""
+        if self._parts_presentation is not presentation:
+            return
+        for part_name, root in self._part_elements.items():
+            part = self._parts[part_name]
+            if not isinstance(part, XmlPart):
+                part.blob = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+    
+    @staticmethod
+    def _element_position(element: Dict[str, Any]) -> Tuple:
+        """Structural position of a text element: slide, shape and paragraph or table cell."""
+        if 'part' in element:
+            return (element['slide_number'], element['part'], element['locator'])
+        if element['type'] == 'table':
+            return (element['slide_number'], element['shape_path'], 'table', element['row_idx'], element['col_idx'])
+        return (element['slide_number'], element['shape_path'], element['type'], element['paragraph_idx'])
+    
+    def align_presentations(self, original_file: str, translated_file: str) -> List[Tuple[str, str]]:
+        """
+        Pair the texts of a presentation with those of its translation.
+        
+        Texts are matched by structural position, so the translated deck must
+        have the same slides and shapes as the original.
+        
+        Returns:
+            (original text, translated text) pairs; empty if the slide counts differ
+        """
+        original = Presentation(original_file)
+        translated = Presentation(translated_file)
+        if len(original.slides) != len(translated.slides):
+            logger.warning(f"Skipping {original_file}: {len(original.slides)} slides, but {translated_file} has {len(translated.slides)}")
+            return []
         
-        return all_text_elements
+        translations = {self._element_position(element): element['text'] for element in self.extract_all_text(translated)}
+        pairs = []
+        for element in self.extract_all_text(original):
+            translation = translations.get(self._element_position(element))
+            if translation is not None:
+                pairs.append((element['text'], translation))
+        return pairs
     
     def apply_translation_to_paragraph(self, paragraph, translated_text: str):
         """
@@ -371,6 +3046,64 @@ class PPTXProcessor:
         if translated_text:
             cell.text = translated_text
     
+    def apply_translation(self, presentation: Presentation, element: Dict[str, Any], translated_text: str):
+        """Write a translation back to the paragraph, cell or chart value an element came from."""
+        if 'locator' in element:
+            self.bind_element(presentation, element)
+        if element['type'] == 'table':
+            self.apply_translation_to_cell(element['cell'], translated_text)
+        elif 'paragraph' in element:
+            self.apply_translation_to_paragraph(element['paragraph'], translated_text)
+        else:
+            element['value'].text = translated_text
+    
+    async def _translate_elements(self, elements: List[Dict[str, Any]], target_language: str, verbose: bool,
+                                  totals: Dict[str, Any]) -> List[str]:
+        """
+        Translate a window of text elements, sending each unique text once.
+        
+        Speaker notes are long prose, so they go in their own requests with larger
+        token budgets, alongside (not mixed with) the slide text requests.
+        """
+        translations: List[Optional[str]] = [None] * len(elements)
+        groups = [[k for k, element in enumerate(elements) if element['type'] != 'notes'],
+                  [k for k, element in enumerate(elements) if element['type'] == 'notes']]
+        totals['elements'] += len(elements)
+        totals['windows'] += 1
+        
+        async def translate_group(indices: List[int], notes: bool):
+            texts = [elements[k]['text'] for k in indices]
+            unique_index: Dict[str, int] = {}
+            positions = [unique_index.setdefault(text, len(unique_index)) for text in texts]
+            totals['unique'] += len(unique_index)
+            # Hashes are enough to count distinct texts across the deck without holding on to them
+            totals['deck_texts'].update(hash((notes, text)) for text in unique_index)
+            if not unique_index:
+                return
+            logger.debug(f"Window of {len(texts)} {'notes' if notes else 'text'} elements has {len(unique_index)} unique texts")
+            
+            options = {}
+            if notes:
+                translator = self.translator
+                options = {
+                    'batch_size': int(translator.batch_size * self.notes_budget) if translator.batch_size > 1 else 1,
+                    'max_input_tokens': int(translator.max_input_tokens * self.notes_budget),
+                    'max_output_tokens': int(translator.max_output_tokens * self.notes_budget)
+                }
+            translated_unique = await self.translator.translate_batch(
+                list(unique_index),
+                target_language,
+                context=NOTES_CONTEXT if notes else PRESENTATION_CONTEXT,
+                verbose=verbose,
+                show_progress=False,
+                **options
+            )
+            for k, position in zip(indices, positions):
+                translations[k] = translated_unique[position]
+        
+        await asyncio.gather(translate_group(groups[0], notes=False), translate_group(groups[1], notes=True))
+        return translations
+    
     async def translate_presentation(self, input_file: str, target_language: str, output_file: str = None, verbose: bool = False) -> str:
         """
         Translate a PowerPoint presentation.
@@ -385,7 +3118,7 @@ class PPTXProcessor:
         """
         logger.info(f"Starting translation of {input_file} to {target_language}")
         
-        # Set cache file
+        # Pick up a legacy per-file cache left by older versions
         self.translator.set_cache_file(input_file, target_language)
         
         # Load presentation
@@ -396,29 +3129,65 @@ class PPTXProcessor:
             logger.error(f"Failed to load presentation {input_file}: {e}")
             raise
         
-        # Extract all text
-        text_elements = self.extract_all_text(presentation)
-        logger.info(f"Extracted {len(text_elements)} text elements")
+        # Slides stream through extraction, translation and write-back: each window of
+        # texts is sent as soon as it is extracted, while later slides are still being read
+        windows: asyncio.Queue = asyncio.Queue(maxsize=self.max_windows)
+        progress = None if verbose else ProgressTracker(len(presentation.slides), f"Translating to {target_language}")
+        pending_tasks = []
+        totals = {'elements': 0, 'unique': 0, 'windows': 0, 'deck_texts': set()}
         
-        if not text_elements:
-            logger.warning("No text found in presentation")
-            return input_file
+        async def extract():
+            slides = self.iter_slide_text_xml(input_file) if self.extractor == 'xml' else self.iter_slide_text(presentation)
+            window, window_slides = [], 0
+            try:
+                for slide_elements in slides:
+                    window.extend(slide_elements)
+                    window_slides += 1
+                    if self.window_size and len(window) >= self.window_size:
+                        task = asyncio.create_task(self._translate_elements(window, target_language, verbose, totals))
+                        pending_tasks.append(task)
+                        await windows.put((task, window, window_slides))
+                        window, window_slides = [], 0
+                    else:
+                        await asyncio.sleep(0)  # Let requests in flight make progress between slides
+                if window_slides:
+                    task = asyncio.create_task(self._translate_elements(window, target_language, verbose, totals))
+                    pending_tasks.append(task)
+                    await windows.put((task, window, window_slides))
+            finally:
+                await windows.put(None)
         
-        # Translate texts
-        texts_to_translate = [element['text'] for element in text_elements]
-        translated_texts = await self.translator.translate_batch(
-            texts_to_translate, 
-            target_language, 
-            context="PowerPoint presentation content",
-            verbose=verbose
-        )
+        async def apply():
+            slides_done = 0
+            while True:
+                item = await windows.get()
+                if item is None:
+                    break
+                task, window, window_slides = item
+                for element, translated_text in zip(window, await task):
+                    self.apply_translation(presentation, element, translated_text)
+                slides_done += window_slides
+                if progress:
+                    progress.update(slides_done)
+        
+        extraction = asyncio.create_task(extract())
+        try:
+            await apply()
+            await extraction
+        finally:
+            for task in [extraction, *pending_tasks]:
+                task.cancel()
         
-        # Apply translations to presentation
-        for element, translated_text in zip(text_elements, translated_texts):
-            if element['type'] == 'text':
-                self.apply_translation_to_paragraph(element['paragraph'], translated_text)
-            elif element['type'] == 'table':
-                self.apply_translation_to_cell(element['cell'], translated_text)
+        if progress:
+            progress.finish()
+        if not totals['elements']:
+            logger.info(f"Extracted 0 text elements ({self.extractor} extractor)")
+            logger.warning("No text found in presentation")
+            return input_file
+        deck_unique = len(totals['deck_texts'])
+        logger.info(f"Extracted {totals['elements']} text elements ({self.extractor} extractor): {deck_unique} unique texts "
+                    f"in the deck ({1 - deck_unique / totals['elements']:.1%} duplicates); translated "
+                    f"{totals['unique']} unique texts in {totals['windows']} windows")
         
         # Save translated presentation
         if output_file is None:
@@ -426,6 +3195,7 @@ class PPTXProcessor:
             output_file = str(input_path.parent / f"{input_path.stem}_translated_{target_language}{input_path.suffix}")
         
         try:
+            self.save_parts(presentation)
             presentation.save(output_file)
             logger.info(f"Saved translated presentation to {output_file}")
         except Exception as e:
@@ -437,8 +3207,183 @@ class PPTXProcessor:
         
         return output_file
 
+def format_cache_statistics(stats: Dict[str, Any]) -> str:
+    """One-line summary of CacheStatistics.summarize() output."""
+    served = sum(stats[name] for name in CacheStatistics.HIT_COUNTERS)
+    return (f"{served}/{stats['lookups']} texts served without an API call ({stats['hit_rate']:.1%}: "
+            f"{stats['hits']} cached, {stats['human_hits']} human, {stats['fallback_hits']} other model, "
+            f"{stats['normalized_hits']} normalized, {stats['fuzzy_hits']} fuzzy); "
+            f"{stats['fuzzy_references']} requests had a fuzzy reference; "
+            f"saved ~{stats['tokens_saved']:,} tokens and {stats['bytes_saved'] / 1024:.1f} KB")
+
+def open_jsonl(path: str, mode: str = 'r'):
+    """Open a JSON Lines file as text, compressed according to its extension (.gz or .xz)."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if str(path).endswith('.xz'):
+        return lzma.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def cache_command(argv: List[str]):
+    """Handle ``translator.py cache ...``: maintenance of the shared translation cache."""
+    parser = argparse.ArgumentParser(
+        prog="translator.py cache",
+        description="Maintain the shared translation cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python translator.py cache compact --unused-for 180
+  python translator.py cache merge translation_cache_*.json --delete
+  python translator.py cache export cache.jsonl.xz
+  python translator.py cache import cache.jsonl.xz
+  python translator.py cache train-dictionary
+  python translator.py cache prewarm originals/ translated/ -l zh-CN
+        """
+    )
+    parser.add_argument('--cache-db', help='Translation cache database (default: ~/.cache/pptx-translator/translation_cache.sqlite3)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compact = commands.add_parser('compact', help='Drop old or unused entries and reclaim disk space')
+    compact.add_argument('--older-than', type=float, metavar='DAYS', help='Drop entries created more than DAYS ago')
+    compact.add_argument('--unused-for', type=float, metavar='DAYS', help='Drop entries not used for DAYS')
+    compact.add_argument('--drop-model', action='append', metavar='MODEL', help='Drop every entry made by MODEL (repeatable)')
+    compact.add_argument('--stale-prompts', action='store_true', help='Drop entries made with older prompt templates')
+
+    merge = commands.add_parser('merge', help='Merge per-file JSON caches into the shared cache')
+    merge.add_argument('files', nargs='*', help='JSON cache files (default: translation_cache_*.json in the current directory)')
+    merge.add_argument('-l', '--language', help='Target language of the files (default: taken from each file name)')
+    merge.add_argument('-m', '--model', default='gemini-2.5-flash', help='Model that made the translations (default: gemini-2.5-flash)')
+    merge.add_argument('--delete', action='store_true', help='Delete each file once it is merged')
+
+    export = commands.add_parser('export', help='Write the cache to a JSON Lines file (compressed if it ends in .gz or .xz)')
+    export.add_argument('file', help='Output file')
+
+    import_ = commands.add_parser('import', help='Merge a file written by "cache export" into the cache')
+    import_.add_argument('file', help='Input file')
+
+    train = commands.add_parser('train-dictionary', help='Train a shared compression dictionary and recompress the cache with it')
+    train.add_argument('--samples', type=int, default=5000, help='Number of translations sampled (default: 5000)')
+
+    stats = commands.add_parser('stats', help='Show cumulative cache statistics')
+    stats.add_argument('--json', action='store_true', help='Print them as JSON')
+
+    prewarm = commands.add_parser('prewarm', help='Add human translations from pairs of original and translated decks')
+    prewarm.add_argument('original', help='Original deck, or a directory of decks')
+    prewarm.add_argument('translated', help='Its translation, or a directory with translated decks of the same names')
+    prewarm.add_argument('-l', '--language', required=True, help='Language of the translated decks')
+
+    args = parser.parse_args(argv)
+    cache = TranslationCache(args.cache_db)
+    memory = TranslationMemory(cache)
+
+    try:
+        if args.command == 'compact':
+            if args.older_than is None and args.unused_for is None and not args.drop_model and not args.stale_prompts:
+                parser.error("compact needs at least one of --older-than, --unused-for, --drop-model, --stale-prompts")
+            removed = cache.compact(
+                older_than=args.older_than * 86400 if args.older_than is not None else None,
+                unused_for=args.unused_for * 86400 if args.unused_for is not None else None,
+                models=args.drop_model,
+                stale_prompts=args.stale_prompts
+            )
+            logger.info(f"Removed {removed} entries; {len(cache)} remain in {cache.path}")
+
+        elif args.command == 'merge':
+            files = args.files or sorted(str(path) for path in Path('.').glob('translation_cache_*.json'))
+            for json_file in files:
+                # Legacy files are named translation_cache_{stem}_{language}_{hash}.json
+                parts = Path(json_file).stem.split('_')
+                language = args.language or (parts[-2] if len(parts) >= 5 else None)
+                if not language:
+                    logger.warning(f"Skipping {json_file}: cannot tell its language, use -l")
+                    continue
+                try:
+                    imported = cache.import_json(json_file, language, args.model)
+                except Exception as e:
+                    logger.error(f"Failed to merge {json_file}: {e}")
+                    continue
+                logger.info(f"Merged {imported} entries from {json_file} ({language})")
+                if args.delete:
+                    os.remove(json_file)
+
+        elif args.command == 'export':
+            count = 0
+            with open_jsonl(args.file, 'w') as f:
+                for entry in cache.entries():
+                    f.write(json.dumps({'type': 'translation', **entry}, ensure_ascii=False) + "\n")
+                    count += 1
+                for entry in memory.entries():
+                    f.write(json.dumps({'type': 'memory', **entry}, ensure_ascii=False) + "\n")
+            logger.info(f"Exported {count} translations and {len(memory)} memory entries to {args.file}")
+
+        elif args.command == 'import':
+            memory_count = 0
+
+            def translations():
+                nonlocal memory_count
+                with open_jsonl(args.file) as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        if entry.get('type') == 'memory':
+                            memory.add(entry['source_text'], entry['target_language'], entry['translation'])
+                            memory_count += 1
+                        else:
+                            yield entry
+
+            count = cache.import_entries(translations())
+            memory.flush()
+            logger.info(f"Imported {count} translations and {memory_count} memory entries from {args.file}")
+
+        elif args.command == 'train-dictionary':
+            size_before = os.path.getsize(cache.path) if os.path.exists(cache.path) else 0
+            recompressed = cache.train_dictionary(args.samples)
+            logger.info(f"Recompressed {recompressed} entries; {cache.path}: "
+                        f"{size_before / 1024 / 1024:.1f} MB -> {os.path.getsize(cache.path) / 1024 / 1024:.1f} MB")
+
+        elif args.command == 'stats':
+            summary = CacheStatistics.summarize(cache.statistics())
+            if args.json:
+                print(json.dumps({'cache': cache.path, 'entries': len(cache), 'cumulative': summary}, indent=2))
+            else:
+                print(f"{cache.path}: {len(cache)} entries")
+                print(format_cache_statistics(summary))
+
+        elif args.command == 'prewarm':
+            if Path(args.original).is_dir():
+                deck_pairs = [(original, Path(args.translated) / original.name) for original in sorted(Path(args.original).glob('*.pptx'))]
+            else:
+                deck_pairs = [(Path(args.original), Path(args.translated))]
+            translator = GeminiTranslator("dummy_key", cache_path=args.cache_db)  # Only its cache is used
+            processor = PPTXProcessor(translator)
+            total = 0
+            try:
+                for original, translated in deck_pairs:
+                    if not translated.exists():
+                        logger.warning(f"Skipping {original}: no translated deck at {translated}")
+                        continue
+                    try:
+                        pairs = processor.align_presentations(str(original), str(translated))
+                    except Exception as e:
+                        logger.error(f"Failed to align {original} with {translated}: {e}")
+                        continue
+                    added = translator.add_human_translations(pairs, args.language)
+                    total += added
+                    logger.info(f"{original.name}: added {added} of {len(pairs)} aligned texts")
+            finally:
+                translator.close()
+            logger.info(f"Pre-warmed the cache with {total} human translations from {len(deck_pairs)} decks")
+    finally:
+        cache.close()
+
 async def main():
     """Main function to handle command line interface."""
+    # Cache maintenance has its own command line
+    if sys.argv[1:2] == ['cache']:
+        cache_command(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Translate PowerPoint presentations using Gemini API (Fixed Version)",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -448,6 +3393,8 @@ Examples:
   python pptx_translate_gemini_fixed.py presentation.pptx -l zh-CN -o translated.pptx
   python pptx_translate_gemini_fixed.py presentation.pptx -l es -m gemini-1.5-pro
   python pptx_translate_gemini_fixed.py -l fr  # Translate all .pptx files in current directory
+  python pptx_translate_gemini_fixed.py presentation.pptx -l en --concurrency 16
+  python pptx_translate_gemini_fixed.py presentation.pptx -l en --batch-size 40
         """
     )
     
@@ -457,6 +3404,61 @@ Examples:
     parser.add_argument('-k', '--api_key', help='Gemini API key (or set GEMINI_API_KEY env var)')
     parser.add_argument('-m', '--model', default='gemini-2.5-flash', 
                        help='Gemini model to use (default: gemini-2.5-flash)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                       help='Number of translation requests in flight to start with (default: 1)')
+    parser.add_argument('--max-concurrency', type=int,
+                       help='Let concurrency grow adaptively up to this limit while the API stays healthy '
+                            '(default: what the model\'s request quota keeps busy, at most 32)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                       help='Maximum number of paragraphs packed into one request (default: 1, no packing)')
+    parser.add_argument('--max-input-tokens', type=int, default=2000,
+                       help='Estimated input token budget per packed request (default: 2000)')
+    parser.add_argument('--max-output-tokens', type=int, default=4000,
+                       help='Estimated output token budget per packed request (default: 4000)')
+    parser.add_argument('--rpm', type=float, help='Requests per minute allowed for the model (default: per-model quota)')
+    parser.add_argument('--tpm', type=float, help='Input tokens per minute allowed for the model (default: per-model quota)')
+    parser.add_argument('--max-retries', type=int, default=3,
+                       help='Retries per request for quota, timeout and transient errors (default: 3)')
+    parser.add_argument('--retry-budget', type=float, default=0.2,
+                       help='Retries allowed per request sent over the whole run (default: 0.2)')
+    parser.add_argument('--breaker-threshold', type=int, default=5,
+                       help='Consecutive API failures that open the circuit breaker, 0 to disable (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                       help='Seconds the circuit stays open before a single probe request (default: 30)')
+    parser.add_argument('--breaker-fail-fast', action='store_true',
+                       help='While the circuit is open, keep the original text of remaining paragraphs instead of '
+                            'pausing the queue until a probe request succeeds')
+    # Pausing is the default now; the old flag is still accepted
+    parser.add_argument('--breaker-pause', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--pool-size', type=int,
+                       help='Worker threads for Gemini calls (default: max concurrency, at least 4)')
+    parser.add_argument('--async-client', action='store_true',
+                       help="Use the Gemini client's native async API instead of worker threads")
+    parser.add_argument('--cache-db', help='Shared SQLite translation cache (default: ~/.cache/pptx-translator/translation_cache.sqlite3 or PPTX_TRANSLATOR_CACHE)')
+    parser.add_argument('--cache-memory-mb', type=float, default=64,
+                       help='Memory cap of the in-memory LRU tier in front of the translation cache (default: 64)')
+    parser.add_argument('--cache-fallback-models', nargs='*', metavar='MODEL',
+                       help='On a cache miss, reuse translations made by these models (no models: any model)')
+    parser.add_argument('--no-cache-normalization', action='store_true',
+                       help='Only reuse cached translations of exactly identical text')
+    parser.add_argument('--fuzzy-threshold', type=float, default=0.85,
+                       help='Minimum similarity of a translation memory match sent to Gemini as a reference (0 disables the memory)')
+    parser.add_argument('--fuzzy-reuse', type=float, default=0.99,
+                       help='Similarity at which a translation memory match is reused without an API call')
+    parser.add_argument('--extractor', choices=['pptx', 'xml'], default='pptx',
+                       help='Text extraction engine: python-pptx object model, or direct slide XML parsing (faster on large decks)')
+    parser.add_argument('--window-size', type=int, default=200,
+                       help='Text elements extracted before they are sent for translation; slides stream through '
+                            'extraction, translation and write-back in windows (0: whole deck at once, default: 200)')
+    parser.add_argument('--no-graphics', action='store_true',
+                       help='Leave chart and SmartArt text untranslated')
+    parser.add_argument('--include-notes', action='store_true',
+                       help='Also translate speaker notes, in their own requests with larger token budgets')
+    parser.add_argument('--notes-budget', type=float, default=4.0,
+                       help='Token budgets and batch size of speaker-notes requests, as a multiple of '
+                            '--max-input-tokens, --max-output-tokens and --batch-size (default: 4)')
+    parser.add_argument('--stats-json', metavar='FILE',
+                       help='Write cache statistics (this run and cumulative) to FILE as JSON')
     parser.add_argument('--list-models', action='store_true', help='List available models and exit')
     parser.add_argument('--profile', action='store_true', help='Enable profiling')
     parser.add_argument('--verbose', action='store_true', help='Show detailed translation progress')
@@ -485,8 +3487,33 @@ Examples:
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Initialize translator
-    translator = GeminiTranslator(api_key, args.model)
-    processor = PPTXProcessor(translator)
+    translator = GeminiTranslator(
+        api_key,
+        args.model,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        max_input_tokens=args.max_input_tokens,
+        max_output_tokens=args.max_output_tokens,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_concurrency=args.max_concurrency,
+        max_retries=args.max_retries,
+        retry_budget=args.retry_budget,
+        breaker_threshold=args.breaker_threshold,
+        breaker_reset=args.breaker_reset,
+        breaker_fail_fast=args.breaker_fail_fast,
+        pool_size=args.pool_size,
+        async_client=args.async_client,
+        cache_path=args.cache_db,
+        cache_memory_mb=args.cache_memory_mb,
+        cache_fallback_models=args.cache_fallback_models,
+        normalize_cache_keys=not args.no_cache_normalization,
+        fuzzy_threshold=args.fuzzy_threshold,
+        fuzzy_reuse_threshold=args.fuzzy_reuse
+    )
+    processor = PPTXProcessor(translator, extractor=args.extractor, window_size=args.window_size,
+                              include_notes=args.include_notes, notes_budget=args.notes_budget,
+                              include_graphics=not args.no_graphics)
     
     # Handle input files
     if args.input_file:
@@ -512,6 +3539,20 @@ Examples:
         except Exception as e:
             logger.error(f"Failed to translate {input_file}: {e}")
     
+    report = translator.cache_report()
+    logger.info(f"Cache this run: {format_cache_statistics(report['run'])}")
+    logger.info(f"Cache all runs: {format_cache_statistics(report['cumulative'])}")
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote cache statistics to {args.stats_json}")
+    translator.close()
+    
+    if translator.untranslated_count:
+        logger.warning(f"{translator.untranslated_count} segments were left untranslated (original text kept)")
+    else:
+        logger.info("All segments translated")
+    
     if args.profile:
         elapsed_time = time.time() - start_time
         logger.info(f"Total processing time: {elapsed_time:.2f} seconds")